@@ -0,0 +1,159 @@
+import time
+import subprocess
+from threading import Lock
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+# Thresholds on 0-255 gray-scale values
+BLACK_MEAN = 16        # Average brightness below this is a black feed
+COVERED_VARIANCE = 30  # Near-uniform picture (lens covered, blank test card)
+# A stalled stream decodes the same picture over and over, so consecutive frames are
+# (almost) bit-identical. A live but static scene still shows sensor noise and encoder
+# updates even after the 160x90 downscale, so keep this close to zero rather than
+# treating "little change" as frozen.
+FROZEN_MOTION = 0.02   # Mean absolute change between frames below this is frozen
+
+
+class FrameAnalyzer:
+    """
+    Detects black, covered and frozen feeds.
+    A few small gray-scale frames per camera are read straight from an ffmpeg pipe
+    (no temp files), then brightness, variance and inter-frame change are computed
+    with NumPy for all cameras in one batch. `submit` runs this in the background so
+    request handlers don't wait on the extra ffmpeg run.
+    """
+
+    def __init__(self, ffmpeg_cmd, frames=3, fps=1, width=160, height=90, timeout=20, max_workers=4):
+        self.ffmpeg_cmd = ffmpeg_cmd
+        self.frames = frames
+        self.fps = fps
+        self.width = width
+        self.height = height
+        self.timeout = timeout
+        self.max_workers = max_workers
+        self._results = {}
+        self._queued = set()
+        self._lock = Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1)
+
+    @property
+    def available(self):
+        return np is not None
+
+    def grab(self, url):
+        """Return up to `frames` raw gray frames as bytes, or None if nothing decoded"""
+        frame_size = self.width * self.height
+        # Same transports as the screenshot capturer: TCP first, then UDP
+        for transport in (['-rtsp_transport', 'tcp'], []):
+            cmd = [
+                self.ffmpeg_cmd(), '-nostdin', '-loglevel', 'error',
+                *transport,
+                '-i', url,
+                '-an',
+                '-vf', f'fps={self.fps},scale={self.width}:{self.height},format=gray',
+                '-frames:v', str(self.frames),
+                '-f', 'rawvideo', '-pix_fmt', 'gray',
+                'pipe:1'
+            ]
+            try:
+                result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, timeout=self.timeout)
+            except Exception as e:
+                print(f"Frame analysis grab failed for {url}: {e}")
+                continue
+            usable = len(result.stdout) // frame_size * frame_size
+            if usable:
+                return result.stdout[:usable]
+        return None
+
+    def analyze(self, urls):
+        """Grab frames for every URL in parallel and classify them in one NumPy batch"""
+        if not self.available:
+            return {}
+        urls = list(dict.fromkeys(urls))
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            buffers = dict(zip(urls, executor.map(self.grab, urls)))
+        return self.classify(buffers)
+
+    def submit(self, urls):
+        """Analyse urls in the background; results show up in latest(). Already queued urls are skipped."""
+        if not self.available:
+            return
+        with self._lock:
+            urls = [url for url in dict.fromkeys(urls) if url not in self._queued]
+            self._queued.update(urls)
+        if urls:
+            self._executor.submit(self._run, urls)
+
+    def _run(self, urls):
+        try:
+            self.analyze(urls)
+        except Exception as e:
+            print(f"Frame analysis failed: {e}")
+        finally:
+            with self._lock:
+                self._queued.difference_update(urls)
+
+    def classify(self, buffers):
+        """Classify raw gray buffers {url: bytes}; cameras with no frames are reported as no_signal"""
+        frame_size = self.width * self.height
+        now = time.time()
+        results = {url: {'status': 'no_signal', 'frames': 0, 'checked': now} for url, buf in buffers.items() if not buf}
+
+        decoded = {url: buf for url, buf in buffers.items() if buf}
+        if decoded:
+            # Pad short captures by repeating their last frame so every camera fits one array
+            count = max(len(buf) // frame_size for buf in decoded.values())
+            batch = np.empty((len(decoded), count, frame_size), dtype=np.uint8)
+            frame_counts = []
+            for i, buf in enumerate(decoded.values()):
+                frames = np.frombuffer(buf, dtype=np.uint8).reshape(-1, frame_size)
+                batch[i, :len(frames)] = frames
+                batch[i, len(frames):] = frames[-1]
+                frame_counts.append(len(frames))
+
+            # Padded frames are masked out so they don't skew the averages towards the last frame
+            counts = np.array(frame_counts)
+            real = np.arange(count) < counts[:, None]
+            pixels = batch.astype(np.float32)
+            means = (pixels.mean(axis=2) * real).sum(axis=1) / counts
+            variances = (pixels.var(axis=2) * real).sum(axis=1) / counts
+            if count > 1:
+                # Only pairs of real frames count; a padded pair has zero change and would dilute motion
+                real_pairs = real[:, 1:]
+                pair_motion = np.abs(np.diff(pixels, axis=1)).mean(axis=2)
+                motion = (pair_motion * real_pairs).sum(axis=1) / np.maximum(real_pairs.sum(axis=1), 1)
+            else:
+                motion = np.full(len(decoded), np.nan)
+
+            for i, url in enumerate(decoded):
+                mean, variance, change = float(means[i]), float(variances[i]), float(motion[i])
+                if mean < BLACK_MEAN and variance < COVERED_VARIANCE:
+                    status = 'black'
+                elif variance < COVERED_VARIANCE:
+                    status = 'covered'
+                elif frame_counts[i] > 1 and change < FROZEN_MOTION:
+                    status = 'frozen'
+                else:
+                    status = 'ok'
+                results[url] = {
+                    'status': status,
+                    'frames': frame_counts[i],
+                    'mean': round(mean, 2),
+                    'variance': round(variance, 2),
+                    'motion': None if frame_counts[i] < 2 else round(change, 3),
+                    'checked': now
+                }
+
+        with self._lock:
+            self._results.update(results)
+        return results
+
+    def latest(self):
+        """Most recent result for every camera analysed so far"""
+        with self._lock:
+            return dict(self._results)
@@ -0,0 +1,286 @@
+import re
+import time
+import uuid
+import errno
+import base64
+import hashlib
+import socket
+import asyncio
+import ipaddress
+
+
+RTSP_PORTS = (554, 8554)
+MAX_SCAN_HOSTS = 65536
+
+# Common RTSP paths by vendor, tried in order until one answers
+VENDOR_PATTERNS = [
+    ('Hikvision', '/Streaming/Channels/101'),
+    ('Dahua / Amcrest', '/cam/realmonitor?channel=1&subtype=0'),
+    ('Reolink', '/h264Preview_01_main'),
+    ('Axis', '/axis-media/media.amp'),
+    ('Uniview', '/media/video1'),
+    ('Foscam', '/videoMain'),
+    ('TP-Link Tapo', '/stream1'),
+    ('Ubiquiti', '/live'),
+    ('Generic', '/live.sdp'),
+    ('Generic', '/h264'),
+    ('Generic', '/'),
+]
+
+WS_DISCOVERY_ADDR = ('239.255.255.250', 3702)
+WS_DISCOVERY_PROBE = (
+    '<?xml version="1.0" encoding="UTF-8"?>'
+    '<e:Envelope xmlns:e="http://www.w3.org/2003/05/soap-envelope" '
+    'xmlns:w="http://schemas.xmlsoap.org/ws/2004/08/addressing" '
+    'xmlns:d="http://schemas.xmlsoap.org/ws/2005/04/discovery" '
+    'xmlns:dn="http://www.onvif.org/ver10/network/wsdl">'
+    '<e:Header><w:MessageID>uuid:{message_id}</w:MessageID>'
+    '<w:To e:mustUnderstand="true">urn:schemas-xmlsoap-org:ws:2005:04:discovery</w:To>'
+    '<w:Action e:mustUnderstand="true">http://schemas.xmlsoap.org/ws/2005/04/discovery/Probe</w:Action>'
+    '</e:Header><e:Body><d:Probe><d:Types>dn:NetworkVideoTransmitter</d:Types></d:Probe></e:Body></e:Envelope>'
+)
+
+
+def parse_network(cidr):
+    """Parse a CIDR (or single IP) and return the list of host addresses to scan"""
+    network = ipaddress.ip_network(cidr.strip(), strict=False)
+    if network.num_addresses > MAX_SCAN_HOSTS:
+        raise ValueError(f'Network too large (max {MAX_SCAN_HOSTS} addresses)')
+    hosts = list(network.hosts()) or [network.network_address]
+    return network, [str(ip) for ip in hosts]
+
+
+class _OnvifProtocol(asyncio.DatagramProtocol):
+    def __init__(self, on_reply):
+        self.on_reply = on_reply
+
+    def datagram_received(self, data, addr):
+        self.on_reply(data.decode('utf-8', errors='ignore'), addr[0])
+
+
+def max_concurrency(headroom=64):
+    """Largest number of sockets we can safely keep open, leaving room for the server itself"""
+    try:
+        import resource
+        soft, _ = resource.getrlimit(resource.RLIMIT_NOFILE)
+        if soft != resource.RLIM_INFINITY:
+            return max(1, soft - headroom)
+        return 4096
+    except (ImportError, ValueError, OSError):
+        return 256  # Windows: the selector event loop is limited to 512 sockets
+
+
+def _digest_authorization(challenge, username, password, method, uri):
+    params = dict(re.findall(r'(\w+)="?([^",]*)"?', challenge))
+    realm, nonce = params.get('realm', ''), params.get('nonce', '')
+    ha1 = hashlib.md5(f'{username}:{realm}:{password}'.encode()).hexdigest()
+    ha2 = hashlib.md5(f'{method}:{uri}'.encode()).hexdigest()
+    header = f'Digest username="{username}", realm="{realm}", nonce="{nonce}", uri="{uri}"'
+    if 'auth' in params.get('qop', '').split(','):
+        cnonce = uuid.uuid4().hex[:16]
+        response = hashlib.md5(f'{ha1}:{nonce}:00000001:{cnonce}:auth:{ha2}'.encode()).hexdigest()
+        header += f', qop=auth, nc=00000001, cnonce="{cnonce}"'
+    else:
+        response = hashlib.md5(f'{ha1}:{nonce}:{ha2}'.encode()).hexdigest()
+    return header + f', response="{response}"'
+
+
+def authorization_header(challenges, username, password, method, uri):
+    """Build an Authorization header for the strongest challenge offered (Digest, then Basic)"""
+    for challenge in challenges:
+        if challenge.lower().startswith('digest'):
+            return _digest_authorization(challenge, username, password, method, uri)
+    for challenge in challenges:
+        if challenge.lower().startswith('basic'):
+            token = base64.b64encode(f'{username}:{password}'.encode()).decode()
+            return f'Basic {token}'
+    return None
+
+
+class RTSPScanner:
+    """
+    Asynchronous subnet scanner for RTSP cameras.
+    A fixed pool of worker coroutines (at most `concurrency`, clamped to the open-file
+    limit) pulls host/port pairs from a shared iterator, so thousands of connects are
+    in flight at once without creating a task per address. Open RTSP ports are probed
+    with DESCRIBE against the vendor URL table, authenticating when credentials are
+    given; results are passed to `emit` as they are found.
+    """
+
+    def __init__(self, concurrency=1024, connect_timeout=1.0, rtsp_timeout=2.0, ports=RTSP_PORTS, patterns=VENDOR_PATTERNS,
+                 username=None, password=''):
+        self.concurrency = min(max(1, int(concurrency)), max_concurrency())
+        self.connect_timeout = connect_timeout
+        self.rtsp_timeout = rtsp_timeout
+        self.ports = tuple(ports)
+        self.patterns = list(patterns)
+        self.username = username
+        self.password = password or ''
+
+    def scan(self, cidr, emit, onvif=True):
+        """Scan a network, blocking until done. Call from a worker thread."""
+        network, hosts = parse_network(cidr)
+        start = time.time()
+        asyncio.run(self._scan(network, hosts, emit, onvif))
+        emit({'type': 'done', 'hosts': len(hosts), 'elapsed': round(time.time() - start, 2)})
+
+    async def _scan(self, network, hosts, emit, onvif):
+        targets = ((host, port) for host in hosts for port in self.ports)
+        workers = min(self.concurrency, len(hosts) * len(self.ports))
+        tasks = [self._worker(targets, emit) for _ in range(workers)]
+        if onvif:
+            tasks.append(self._onvif_discover(network, emit))
+        await asyncio.gather(*tasks)
+
+    async def _worker(self, targets, emit):
+        # The event loop is single-threaded, so sharing one generator between workers is safe
+        for host, port in targets:
+            try:
+                await self._scan_host(host, port, emit)
+            except Exception as e:
+                emit({'type': 'error', 'ip': host, 'port': port, 'error': str(e)})
+
+    async def _scan_host(self, host, port, emit):
+        if not await self._port_open(host, port):
+            return
+        emit({'type': 'host', 'ip': host, 'port': port})
+
+        # A camera that answers a nonsense path the same way can't tell us which path is real,
+        # so an answer only counts when it differs from the nonsense path's
+        bogus = await self._describe(host, port, f'/{uuid.uuid4().hex}')
+        if bogus == 200:
+            # Serves any path: report the first pattern and let validation decide
+            vendor, path = self.patterns[0]
+            emit({
+                'type': 'candidate',
+                'ip': host,
+                'port': port,
+                'vendor': vendor,
+                'url': f'rtsp://{host}:{port}{path}',
+                'status': 200,
+                'auth_required': False,
+                'ambiguous': True
+            })
+            return
+        for vendor, path in self.patterns:
+            status = await self._describe(host, port, path)
+            if status not in (200, 401) or status == bogus:
+                continue
+            emit({
+                'type': 'candidate',
+                'ip': host,
+                'port': port,
+                'vendor': vendor,
+                'url': f'rtsp://{host}:{port}{path}',
+                'status': status,
+                'auth_required': status == 401,
+                'ambiguous': False
+            })
+            return
+
+        if bogus == 401:
+            # Every path (nonsense included) wants credentials: without them, or with
+            # rejected ones, the real path can't be told apart
+            emit({
+                'type': 'auth_required',
+                'ip': host,
+                'port': port,
+                'credentials_rejected': bool(self.username)
+            })
+
+    async def _port_open(self, host, port, attempts=3):
+        """True if the port accepts a connection. Running out of file descriptors is an error, not 'closed'."""
+        for attempt in range(attempts):
+            try:
+                _, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout=self.connect_timeout)
+            except asyncio.TimeoutError:
+                return False
+            except OSError as e:
+                if e.errno not in (errno.EMFILE, errno.ENFILE):
+                    return False
+                if attempt == attempts - 1:
+                    raise OSError(e.errno, f'Out of file descriptors while connecting to {host}:{port}; lower concurrency')
+                await asyncio.sleep(0.1 * (attempt + 1))
+                continue
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except OSError:
+                pass
+            return True
+
+    async def _request(self, reader, writer, host, port, path, cseq, authorization=None):
+        uri = f'rtsp://{host}:{port}{path}'
+        lines = [f'DESCRIBE {uri} RTSP/1.0', f'CSeq: {cseq}', 'Accept: application/sdp', 'User-Agent: OpenSurv-Manager']
+        if authorization:
+            lines.append(f'Authorization: {authorization}')
+        writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode())
+        await writer.drain()
+
+        status_line = await asyncio.wait_for(reader.readline(), timeout=self.rtsp_timeout)
+        match = re.match(rb'RTSP/\d\.\d\s+(\d{3})', status_line)
+        if not match:
+            return None, []
+        challenges = []
+        length = 0
+        while True:
+            line = await asyncio.wait_for(reader.readline(), timeout=self.rtsp_timeout)
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            if name.strip().lower() == 'www-authenticate':
+                challenges.append(value.strip())
+            elif name.strip().lower() == 'content-length':
+                length = int(value.strip() or 0)
+        if length:
+            await asyncio.wait_for(reader.readexactly(length), timeout=self.rtsp_timeout)
+        return int(match.group(1)), challenges
+
+    async def _describe(self, host, port, path):
+        """
+        Send an RTSP DESCRIBE and return the status code, or None if there was no valid reply.
+        With credentials, a 401 is answered on the same connection with Digest/Basic auth.
+        """
+        writer = None
+        try:
+            reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout=self.connect_timeout)
+            status, challenges = await self._request(reader, writer, host, port, path, 1)
+            if status == 401 and self.username:
+                authorization = authorization_header(challenges, self.username, self.password, 'DESCRIBE', f'rtsp://{host}:{port}{path}')
+                if authorization:
+                    status, _ = await self._request(reader, writer, host, port, path, 2, authorization)
+            return status
+        except (OSError, ValueError, asyncio.TimeoutError, asyncio.IncompleteReadError):
+            return None
+        finally:
+            if writer:
+                writer.close()
+
+    async def _onvif_discover(self, network, emit, timeout=3.0):
+        """Send a WS-Discovery probe and report ONVIF devices that reply from inside the network"""
+        seen = set()
+
+        def on_reply(payload, ip):
+            try:
+                if ipaddress.ip_address(ip) not in network or ip in seen:
+                    return
+            except ValueError:
+                return
+            seen.add(ip)
+            match = re.search(r'XAddrs>([^<]+)<', payload)
+            emit({'type': 'onvif', 'ip': ip, 'xaddrs': match.group(1).split() if match else []})
+
+        loop = asyncio.get_running_loop()
+        try:
+            transport, _ = await loop.create_datagram_endpoint(
+                lambda: _OnvifProtocol(on_reply), family=socket.AF_INET)
+        except OSError:
+            return
+        try:
+            probe = WS_DISCOVERY_PROBE.format(message_id=uuid.uuid4()).encode()
+            transport.sendto(probe, WS_DISCOVERY_ADDR)
+            await asyncio.sleep(timeout)
+        except OSError:
+            pass
+        finally:
+            transport.close()
@@ -0,0 +1,196 @@
+import json
+import time
+import http.client
+from queue import Queue, Empty
+from threading import Lock
+from urllib.parse import urlsplit
+from concurrent.futures import ThreadPoolExecutor
+
+
+class HostConnectionPool:
+    """Small pool of keep-alive HTTP connections to one remote OpenSurv Manager"""
+
+    def __init__(self, base_url, size=4, timeout=10):
+        parts = urlsplit(base_url if '://' in base_url else f'http://{base_url}')
+        self.scheme = parts.scheme
+        self.host = parts.hostname
+        self.port = parts.port
+        self.prefix = parts.path.rstrip('/')
+        self.timeout = timeout
+        self._idle = Queue(maxsize=size)
+
+    def _connect(self):
+        if self.scheme == 'https':
+            return http.client.HTTPSConnection(self.host, self.port, timeout=self.timeout)
+        return http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+
+    def request(self, method, path, payload=None, headers=None):
+        """Send a JSON request and return (status, headers, decoded body)"""
+        try:
+            conn = self._idle.get_nowait()
+        except Empty:
+            conn = self._connect()
+
+        body = json.dumps(payload).encode('utf-8') if payload is not None else None
+        all_headers = {'Accept': 'application/json', 'Connection': 'keep-alive'}
+        if body is not None:
+            all_headers['Content-Type'] = 'application/json'
+        all_headers.update(headers or {})
+
+        try:
+            conn.request(method, self.prefix + path, body=body, headers=all_headers)
+            response = conn.getresponse()
+            raw = response.read()
+        except Exception:
+            conn.close()
+            raise
+
+        if response.will_close:
+            conn.close()
+        else:
+            try:
+                self._idle.put_nowait(conn)
+            except Exception:
+                conn.close()
+
+        data = json.loads(raw.decode('utf-8')) if raw else {}
+        return response.status, dict(response.getheaders()), data
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except Empty:
+                return
+
+
+class FleetManager:
+    """
+    Talks to other instances of this server over their normal API.
+    Requests go through per-host keep-alive pools and a shared thread pool,
+    so at most `max_workers` hosts are contacted at once.
+    """
+
+    def __init__(self, hosts=None, max_workers=8, retries=2, timeout=10):
+        self.max_workers = max_workers
+        self.retries = retries
+        self.timeout = timeout
+        self._hosts = {}
+        self._pools = {}
+        self._lock = Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+        for host in hosts or []:
+            self.add_host(host['name'], host['url'], host.get('group', 'default'))
+
+    # ----- Registry -----
+
+    def add_host(self, name, url, group='default'):
+        with self._lock:
+            old_pool = self._pools.pop(name, None)
+            self._hosts[name] = {'name': name, 'url': url.rstrip('/'), 'group': group or 'default'}
+            self._pools[name] = HostConnectionPool(url, size=4, timeout=self.timeout)
+        if old_pool:
+            old_pool.close()
+
+    def remove_host(self, name):
+        with self._lock:
+            host = self._hosts.pop(name, None)
+            pool = self._pools.pop(name, None)
+        if pool:
+            pool.close()
+        return host is not None
+
+    def hosts(self):
+        with self._lock:
+            return list(self._hosts.values())
+
+    def select(self, names=None, group=None):
+        """Pick hosts by explicit names and/or group; no filter means every host"""
+        selected = []
+        for host in self.hosts():
+            if names and host['name'] not in names:
+                continue
+            if group and host['group'] != group:
+                continue
+            selected.append(host)
+        return selected
+
+    # ----- Requests -----
+
+    def _call(self, name, method, path, payload=None, headers=None):
+        """Request with retries on connection errors and 5xx responses"""
+        pool = self._pools.get(name)
+        if pool is None:
+            raise KeyError(f'Unknown host: {name}')
+        attempt = 0
+        while True:
+            try:
+                status, response_headers, data = pool.request(method, path, payload, headers)
+                if status < 500 or attempt >= self.retries:
+                    return status, response_headers, data, attempt + 1
+            except Exception:
+                if attempt >= self.retries:
+                    raise
+            attempt += 1
+            time.sleep(min(0.25 * (2 ** attempt), 2))
+
+    def _run(self, hosts, func):
+        """Run func(host) for each host on the shared pool and collect per-host results"""
+        futures = {host['name']: self._executor.submit(self._timed, func, host) for host in hosts}
+        return {name: future.result() for name, future in futures.items()}
+
+    def _timed(self, func, host):
+        start = time.time()
+        try:
+            result = func(host)
+        except Exception as e:
+            result = {'success': False, 'error': str(e)}
+        result['elapsed_ms'] = round((time.time() - start) * 1000)
+        return result
+
+    def health(self, hosts):
+        def check(host):
+            status, _, data, attempts = self._call(host['name'], 'GET', '/api/health')
+            return {'success': status == 200 and data.get('success', False), 'status': status, 'attempts': attempts, 'health': data}
+        return self._run(hosts, check)
+
+    def fetch_configs(self, hosts, monitor=1):
+        def fetch(host):
+            status, _, data, attempts = self._call(host['name'], 'GET', f'/api/monitors/{int(monitor)}')
+            if status != 200:
+                return {'success': False, 'status': status, 'attempts': attempts, 'error': data.get('error')}
+            return {'success': True, 'attempts': attempts, 'etag': data.get('etag'), 'content': data.get('content')}
+        return self._run(hosts, fetch)
+
+    def push_config(self, hosts, content, monitor=1):
+        def push(host):
+            status, _, data, attempts = self._call(host['name'], 'POST', f'/api/monitors/{int(monitor)}', {'content': content})
+            return {'success': status == 200 and data.get('success', False), 'status': status, 'attempts': attempts,
+                    'etag': data.get('etag'), 'error': data.get('error')}
+        return self._run(hosts, push)
+
+    def push_camera_change(self, hosts, old_url, new_url, monitor=1):
+        """
+        Swap one camera URL on every host without touching the rest of their configs.
+        Each host's config is fetched, edited and saved back with If-Match so a
+        concurrent local edit is never overwritten.
+        """
+        def change(host):
+            status, _, data, attempts = self._call(host['name'], 'GET', f'/api/monitors/{int(monitor)}')
+            if status != 200:
+                return {'success': False, 'status': status, 'attempts': attempts, 'error': data.get('error')}
+            content = data.get('content') or ''
+            needle = f'"{old_url}"'
+            if needle not in content:
+                return {'success': True, 'changed': False, 'attempts': attempts}
+            updated = content.replace(needle, f'"{new_url}"')
+            status, _, data, more = self._call(host['name'], 'POST', f'/api/monitors/{int(monitor)}',
+                                               {'content': updated}, {'If-Match': f'"{data.get("etag")}"'})
+            return {'success': status == 200 and data.get('success', False), 'changed': status == 200, 'status': status,
+                    'attempts': attempts + more, 'error': data.get('error')}
+        return self._run(hosts, change)
+
+    def close(self):
+        for name in [host['name'] for host in self.hosts()]:
+            self.remove_host(name)
+        self._executor.shutdown(wait=False)
@@ -0,0 +1,216 @@
+import re
+import csv
+import codecs
+import json
+import difflib
+from urllib.parse import urlsplit
+
+
+VALID_SCHEMES = ('rtsp', 'rtsps', 'rtmp', 'http', 'https')
+URL_PATTERN = re.compile(r'url:\s*"([^"]+)"')
+SCREEN_START = re.compile(r'^\s*- streams:\s*$')
+SCREEN_PROPERTY = re.compile(r'^ {6}[A-Za-z_]+:')
+OUTER_KEY = re.compile(r'^ {0,2}[A-Za-z_]+:')
+TRUE_VALUES = ('1', 'true', 'yes', 'y')
+
+
+def iter_rows(stream, fmt):
+    """
+    Parse an upload row by row without loading it into memory.
+    Yields (line_number, dict) for CSV (header row required) or NDJSON.
+    """
+    # Decode line by line rather than with io.TextIOWrapper: before Python 3.11 the
+    # SpooledTemporaryFile behind Werkzeug uploads has no readable() and can't be wrapped
+    text = codecs.iterdecode(stream, 'utf-8-sig', errors='replace')
+    if fmt == 'csv':
+        reader = csv.DictReader(text)
+        for row in reader:
+            yield reader.line_num, {(k or '').strip().lower(): (v or '').strip() for k, v in row.items()}
+    elif fmt == 'ndjson':
+        for line_number, line in enumerate(text, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as e:
+                yield line_number, {'_error': f'Invalid JSON: {e}'}
+                continue
+            yield line_number, row if isinstance(row, dict) else {'_error': 'Row is not an object'}
+    else:
+        raise ValueError(f'Unsupported format: {fmt}')
+
+
+def validate_url(url):
+    """Return an error message for an unusable stream URL, or None"""
+    if not url:
+        return 'Missing url'
+    if '"' in url or any(c.isspace() for c in url):
+        return 'URL contains quotes or whitespace'
+    parts = urlsplit(url)
+    if parts.scheme.lower() not in VALID_SCHEMES:
+        return f'Unsupported URL scheme: {parts.scheme or "none"}'
+    if not parts.hostname:
+        return 'URL has no host'
+    return None
+
+
+def normalize_row(row):
+    """Turn a CSV/NDJSON row into a stream dict; returns (stream, error)"""
+    if '_error' in row:
+        return None, row['_error']
+    url = str(row.get('url') or '').strip()
+    error = validate_url(url)
+    if error:
+        return None, error
+
+    alternates = row.get('alternate_urls') or row.get('alternate_url') or []
+    if isinstance(alternates, str):
+        alternates = [a.strip() for a in alternates.split('|') if a.strip()]
+    for alternate in alternates:
+        if validate_url(alternate):
+            return None, f'Invalid alternate URL: {alternate}'
+
+    screen = row.get('screen')
+    try:
+        screen = int(screen) if screen not in (None, '') else None
+    except (TypeError, ValueError):
+        return None, f'Invalid screen: {screen}'
+    if screen is not None and screen < 1:
+        return None, 'Screen numbers start at 1'
+
+    disabled = row.get('disabled')
+    name = re.sub(r'[\r\n]+', ' ', str(row.get('name') or '')).strip() or None
+    return {
+        'url': url,
+        'name': name,
+        'alternate_urls': alternates,
+        'screen': screen,
+        'disabled': str(disabled).strip().lower() in TRUE_VALUES if disabled is not None else False
+    }, None
+
+
+def render_stream(stream):
+    """Render one stream the same way the editor's YAML stringify does"""
+    lines = []
+    if stream['name']:
+        lines.append(f"#{stream['name']}")
+    block = [f'        - url: "{stream["url"]}"']
+    for alternate in stream['alternate_urls']:
+        block.append(f'#         alternate_url: "{alternate}"')
+    if stream['disabled']:
+        block = [line if line.startswith('#') else '#' + line for line in block]
+    return lines + block
+
+
+def existing_urls(content):
+    """Every stream URL in the file, including commented-out (disabled) ones"""
+    return set(URL_PATTERN.findall(content or ''))
+
+
+def _screen_spans(lines):
+    """Return [(start, end)] line ranges of each '- streams:' screen block"""
+    starts = [i for i, line in enumerate(lines) if SCREEN_START.match(line)]
+    spans = []
+    for n, start in enumerate(starts):
+        end = starts[n + 1] if n + 1 < len(starts) else len(lines)
+        # The documentation section at the bottom of stock configs isn't part of any screen,
+        # and neither are keys that follow the screens list
+        for i in range(start + 1, end):
+            if lines[i].startswith('#####') or 'What follows is documentation' in lines[i] or OUTER_KEY.match(lines[i]):
+                end = i
+                break
+        spans.append((start, end))
+    return spans
+
+
+def stream_counts(config):
+    """Number of streams on each screen of a parsed config"""
+    screens = ((config or {}).get('essentials') or {}).get('screens') or []
+    return [len((screen or {}).get('streams') or []) for screen in screens]
+
+
+def plan_import(config, streams, columns=2, rows=None):
+    """
+    Assign new streams to screens.
+    Rows with an explicit screen go there (screen numbers past the end open new
+    screens, which must follow on from the existing ones without gaps); the rest
+    fill the last screen up to columns x rows cameras and then spill onto new screens.
+    Returns {screen_index: [stream, ...]} and the number of screens afterwards.
+    """
+    columns = max(1, int(columns))
+    capacity = columns * max(1, int(rows or columns))
+    counts = stream_counts(config)
+    existing = len(counts)
+    assignments = {}
+
+    requested = sorted({stream['screen'] for stream in streams if stream['screen'] is not None and stream['screen'] > existing})
+    if requested and requested != list(range(existing + 1, existing + len(requested) + 1)):
+        missing = sorted(set(range(existing + 1, requested[-1])) - set(requested))
+        raise ValueError(f'Screen {requested[-1]} would leave screen {missing[0]} empty; the config has {existing} screen(s)')
+    counts.extend(0 for _ in requested)
+
+    for stream in streams:
+        if stream['screen'] is not None:
+            index = stream['screen'] - 1
+        else:
+            index = len(counts) - 1
+            if index < 0 or counts[index] >= capacity:
+                counts.append(0)
+                index = len(counts) - 1
+        counts[index] += 1
+        assignments.setdefault(index, []).append(stream)
+    return assignments, len(counts)
+
+
+def apply_import(content, assignments, columns=2):
+    """Insert the assigned streams into the YAML text, keeping everything else untouched"""
+    lines = (content or '').split('\n')
+    if not any(line.strip() == 'screens:' for line in lines):
+        if (content or '').strip():
+            raise ValueError('Configuration has no screens section')
+        lines = [
+            '#THIS IS A YAML FILE, INDENTATION IS IMPORTANT. ALSO DO NOT USE TABS FOR INDENTATION, BUT USE SPACES',
+            '',
+            'essentials:',
+            '  disable_autorotation: False',
+            '',
+            '  screens:',
+            ''
+        ]
+    spans = _screen_spans(lines)
+    inserts = {}  # line index -> lines to insert before it
+
+    for index in sorted(assignments):
+        rendered = [line for stream in assignments[index] for line in render_stream(stream)]
+        if index < len(spans):
+            start, end = spans[index]
+            # Streams go before the screen-level properties (duration, nr_of_columns, ...)
+            position = next((i for i in range(start + 1, end) if SCREEN_PROPERTY.match(lines[i])), None)
+            if position is None:
+                position = end
+                while position > start + 1 and not lines[position - 1].strip():
+                    position -= 1
+            inserts.setdefault(position, []).extend(rendered)
+        else:
+            if spans:
+                position = spans[-1][1]
+                while position > spans[-1][0] + 1 and not lines[position - 1].strip():
+                    position -= 1
+            else:
+                position = next(i for i, line in enumerate(lines) if line.strip() == 'screens:') + 1
+            block = ['', '    - streams:'] + rendered + [f'      nr_of_columns: {columns}']
+            inserts.setdefault(position, []).extend(block)
+
+    output = []
+    for i, line in enumerate(lines):
+        output.extend(inserts.get(i, []))
+        output.append(line)
+    output.extend(inserts.get(len(lines), []))
+    return '\n'.join(output)
+
+
+def diff(old, new, filename):
+    return ''.join(difflib.unified_diff(
+        old.splitlines(keepends=True), new.splitlines(keepends=True),
+        fromfile=f'a/{filename}', tofile=f'b/{filename}'))
@@ -0,0 +1,262 @@
+import hashlib
+import json
+import math
+import re
+from collections import OrderedDict
+from threading import Lock
+
+
+DEFAULT_RESOLUTION = (1920, 1080)
+DEFAULT_COLUMNS = 2
+
+
+def parse_resolution(content):
+    """Read the '# Resolution: WxH' comment the editor writes into the config"""
+    match = re.search(r'Resolution:\s*(\d+)x(\d+)', content or '', re.IGNORECASE)
+    if match:
+        return int(match.group(1)), int(match.group(2))
+    return DEFAULT_RESOLUTION
+
+
+def _js_round(value):
+    """Round halves up like JS Math.round (Python's round() rounds halves to even)"""
+    return math.floor(value + 0.5)
+
+
+def grid_rects(count, columns, width, height):
+    """
+    Split the screen into a columns x rows grid, the same way the browser preview does.
+    Returns a list of [x1, y1, x2, y2] rects in row-major order.
+    """
+    if count <= 0:
+        return []
+    columns = max(1, int(columns or DEFAULT_COLUMNS))
+    rows = math.ceil(count / columns)
+    cell_width = width / columns
+    cell_height = height / rows
+
+    rects = []
+    for index in range(count):
+        col = index % columns
+        row = index // columns
+        rects.append([
+            _js_round(col * cell_width),
+            _js_round(row * cell_height),
+            _js_round((col + 1) * cell_width),
+            _js_round((row + 1) * cell_height)
+        ])
+    return rects
+
+
+def find_overlaps(tiles):
+    """
+    Find every pair of overlapping tiles with a sweep over the x axis.
+    Tiles are sorted by x1 and only compared against tiles still "open" at that x,
+    so each tile is checked against roughly one column of tiles (O(n * rows) for a
+    grid) instead of against every other tile.
+    """
+    events = sorted(tiles, key=lambda t: (t['rect'][0], t['rect'][2]))
+    active = []
+    overlaps = []
+    for tile in events:
+        x1, y1, x2, y2 = tile['rect']
+        # Drop tiles that end at or before this one starts
+        active = [a for a in active if a['rect'][2] > x1]
+        for other in active:
+            ox1, oy1, ox2, oy2 = other['rect']
+            if oy1 < y2 and y1 < oy2:
+                ix1, iy1 = max(x1, ox1), max(y1, oy1)
+                ix2, iy2 = min(x2, ox2), min(y2, oy2)
+                first, second = sorted((other['index'], tile['index']))
+                overlaps.append({
+                    'a': first,
+                    'b': second,
+                    'rect': [ix1, iy1, ix2, iy2],
+                    'area': (ix2 - ix1) * (iy2 - iy1)
+                })
+        active.append(tile)
+    overlaps.sort(key=lambda o: (o['a'], o['b']))
+    return overlaps
+
+
+def _merge_intervals(intervals):
+    merged = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return merged
+
+
+def find_gaps(tiles, width, height):
+    """
+    Find screen areas not covered by any tile.
+    The x axis is cut into slabs at every tile edge; inside each slab the covered
+    y intervals are merged and the holes become gap rects. Neighbouring slabs with
+    identical holes are joined so a single empty cell comes back as one rect.
+    Returns (gaps, covered_area).
+    """
+    clipped = []
+    for tile in tiles:
+        x1, y1, x2, y2 = tile['rect']
+        x1, x2 = max(0, x1), min(width, x2)
+        y1, y2 = max(0, y1), min(height, y2)
+        if x2 > x1 and y2 > y1:
+            clipped.append((x1, y1, x2, y2))
+
+    xs = sorted({0, width} | {r[0] for r in clipped} | {r[2] for r in clipped})
+    gaps = []
+    open_gaps = {}  # (y1, y2) -> gap rect still growing to the right
+    covered_area = 0
+
+    for left, right in zip(xs, xs[1:]):
+        covered = _merge_intervals([(r[1], r[3]) for r in clipped if r[0] < right and r[2] > left])
+        covered_area += (right - left) * sum(end - start for start, end in covered)
+
+        holes = []
+        cursor = 0
+        for start, end in covered:
+            if start > cursor:
+                holes.append((cursor, start))
+            cursor = max(cursor, end)
+        if cursor < height:
+            holes.append((cursor, height))
+
+        next_open = {}
+        for hole in holes:
+            if hole in open_gaps:
+                gap = open_gaps[hole]
+                gap[2] = right
+            else:
+                gap = [left, hole[0], right, hole[1]]
+                gaps.append(gap)
+            next_open[hole] = gap
+        open_gaps = next_open
+
+    return gaps, covered_area
+
+
+def best_grid(count, width, height, aspect=16 / 9):
+    """
+    Pick the column count that shows `count` cameras as large as possible.
+    Each cell is scored by the area a video of the given aspect ratio gets once
+    letterboxed into it; ties go to the grid with fewer empty cells.
+    Returns (columns, rows).
+    """
+    if count <= 0:
+        return 1, 0
+    best = None
+    for columns in range(1, count + 1):
+        rows = math.ceil(count / columns)
+        cell_width = width / columns
+        cell_height = height / rows
+        video_width = min(cell_width, cell_height * aspect)
+        video_height = video_width / aspect
+        score = (video_width * video_height, -(columns * rows - count))
+        if best is None or score > best[0]:
+            best = (score, columns, rows)
+    return best[1], best[2]
+
+
+class LayoutEngine:
+    def __init__(self, cache_size=32):
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._lock = Lock()
+
+    def config_hash(self, config, width, height):
+        """Stable hash of the parsed config plus resolution, used as the cache key"""
+        payload = json.dumps([config, width, height], sort_keys=True, default=str)
+        return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+    def screen_layout(self, screen, width, height):
+        """
+        Compute tile rects for one screen.
+        Streams with force_coordinates keep them; the rest are laid out on the
+        nr_of_columns grid, matching what OpenSurv and the preview render.
+        Raises ValueError for a screen or coordinates OpenSurv couldn't use either.
+        """
+        if not isinstance(screen, dict):
+            raise ValueError('Each screen must be a mapping')
+        streams = screen.get('streams') or []
+        if not isinstance(streams, list):
+            raise ValueError('streams must be a list')
+        tiles = []
+        auto = []
+        for index, stream in enumerate(streams):
+            if not isinstance(stream, dict) or stream.get('disabled'):
+                continue
+            coords = stream.get('force_coordinates')
+            tile = {
+                'index': index,
+                'url': stream.get('url'),
+                'showontop': bool(stream.get('showontop')),
+            }
+            if isinstance(coords, (list, tuple)) and len(coords) == 4:
+                try:
+                    tile['rect'] = [int(c) for c in coords]
+                except (TypeError, ValueError):
+                    raise ValueError(f'Stream {index + 1}: force_coordinates must be four integers, got {coords}')
+                tile['source'] = 'forced'
+            else:
+                tile['source'] = 'grid'
+                auto.append(tile)
+            tiles.append(tile)
+
+        for tile, rect in zip(auto, grid_rects(len(auto), screen.get('nr_of_columns'), width, height)):
+            tile['rect'] = rect
+
+        # Overlaps with a showontop tile are intentional picture-in-picture
+        by_index = {tile['index']: tile for tile in tiles}
+        overlaps = [
+            o for o in find_overlaps(tiles)
+            if not (by_index[o['a']]['showontop'] or by_index[o['b']]['showontop'])
+        ]
+        gaps, covered_area = find_gaps(tiles, width, height)
+        for tile in tiles:
+            x1, y1, x2, y2 = tile['rect']
+            tile['width'] = x2 - x1
+            tile['height'] = y2 - y1
+            tile['out_of_bounds'] = x1 < 0 or y1 < 0 or x2 > width or y2 > height
+
+        return {
+            'tiles': tiles,
+            'overlaps': overlaps,
+            'gaps': gaps,
+            'coverage': round(covered_area / (width * height), 4) if width and height else 0
+        }
+
+    def compute(self, config, width, height):
+        """Compute the layout of every screen, cached by config hash"""
+        key = self.config_hash(config, width, height)
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+
+        if not isinstance(config, dict) or not isinstance(config.get('essentials') or {}, dict):
+            raise ValueError('Configuration must be a mapping with an essentials section')
+        screens = (config.get('essentials') or {}).get('screens') or []
+        if not isinstance(screens, list):
+            raise ValueError('screens must be a list')
+        result = {
+            'hash': key,
+            'resolution': {'width': width, 'height': height},
+            'screens': [self.screen_layout(screen or {}, width, height) for screen in screens]
+        }
+
+        with self._lock:
+            self._cache[key] = result
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return result
+
+    def pack(self, count, width, height, aspect=16 / 9):
+        """Auto-pack `count` cameras into the best-fitting grid"""
+        columns, rows = best_grid(count, width, height, aspect)
+        return {
+            'nr_of_columns': columns,
+            'rows': rows,
+            'force_coordinates': grid_rects(count, columns, width, height)
+        }
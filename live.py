@@ -0,0 +1,218 @@
+import time
+import subprocess
+from collections import deque
+from threading import Thread, Condition, Lock
+
+
+JPEG_START = b'\xff\xd8'
+JPEG_END = b'\xff\xd9'
+
+
+class CameraDecoder:
+    """
+    One ffmpeg process per camera, decoding to low-fps MJPEG on stdout.
+    Frames land in a small ring buffer; viewers wait on a condition for the next one.
+    `io_timeout` makes ffmpeg give up on a camera that stops sending data.
+    """
+
+    def __init__(self, url, ffmpeg_cmd, fps=2, width=640, buffer_size=4, io_timeout=10):
+        self.url = url
+        self.ffmpeg_cmd = ffmpeg_cmd
+        self.fps = fps
+        self.width = width
+        self.io_timeout = io_timeout
+        self.frames = deque(maxlen=buffer_size)  # (sequence, jpeg bytes)
+        self.sequence = 0
+        self.viewers = 0
+        self.running = False
+        self.error = None
+        self._cond = Condition()
+        self._process = None
+        self._thread = None
+
+    def start(self):
+        # Socket I/O timeout in microseconds: -timeout for RTSP, -rw_timeout for other protocols
+        microseconds = str(int(self.io_timeout * 1000000))
+        if self.url.lower().startswith(('rtsp://', 'rtsps://')):
+            input_options = ['-rtsp_transport', 'tcp', '-timeout', microseconds]
+        else:
+            input_options = ['-rw_timeout', microseconds]
+        cmd = [
+            self.ffmpeg_cmd, '-nostdin', '-loglevel', 'error',
+            *input_options,
+            '-i', self.url,
+            '-an',
+            '-vf', f'fps={self.fps},scale={self.width}:-2',
+            '-f', 'image2pipe', '-c:v', 'mjpeg', '-q:v', '7',
+            'pipe:1'
+        ]
+        self.running = True
+        self._process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, stdin=subprocess.DEVNULL)
+        self._thread = Thread(target=self._read_frames, daemon=True)
+        self._thread.start()
+
+    def _read_frames(self):
+        buffer = b''
+        try:
+            while self.running:
+                chunk = self._process.stdout.read1(65536)
+                if not chunk:
+                    break
+                buffer += chunk
+                while True:
+                    start = buffer.find(JPEG_START)
+                    if start < 0:
+                        buffer = b''
+                        break
+                    end = buffer.find(JPEG_END, start + 2)
+                    if end < 0:
+                        buffer = buffer[start:]
+                        break
+                    self._publish(buffer[start:end + 2])
+                    buffer = buffer[end + 2:]
+        except Exception as e:
+            self.error = str(e)
+        finally:
+            if self.running and self.error is None:
+                self.error = 'Stream ended'
+            self.running = False
+            with self._cond:
+                self._cond.notify_all()
+
+    def _publish(self, frame):
+        with self._cond:
+            self.sequence += 1
+            self.frames.append((self.sequence, frame))
+            self._cond.notify_all()
+
+    def latest(self):
+        with self._cond:
+            return self.frames[-1] if self.frames else (0, None)
+
+    def wait_for_frame(self, after, timeout=10):
+        """Block until a frame newer than `after` exists; returns (sequence, frame) or (after, None)"""
+        with self._cond:
+            self._cond.wait_for(lambda: self.sequence > after or not self.running, timeout=timeout)
+            if self.sequence > after and self.frames:
+                return self.frames[-1]
+            return after, None
+
+    def fail(self, error):
+        """Give up on a decoder that stopped producing frames"""
+        if self.error is None:
+            self.error = error
+        self.stop()
+
+    def stop(self):
+        self.running = False
+        if self._process and self._process.poll() is None:
+            self._process.terminate()
+            try:
+                self._process.wait(timeout=3)
+            except subprocess.TimeoutExpired:
+                self._process.kill()
+        with self._cond:
+            self._cond.notify_all()
+
+
+class LivePreviewHub:
+    """
+    Shares one CameraDecoder per URL between every viewer.
+    `ffmpeg_cmd` is a callable returning the ffmpeg path, resolved when a decoder starts.
+    Decoders are reference-counted and stopped `idle_timeout` seconds after the last viewer leaves,
+    so quickly switching screens doesn't restart ffmpeg. A decoder that produces no frame for
+    `frame_timeout` x `max_missed_frames` seconds is treated as dead and its streams end.
+    """
+
+    def __init__(self, ffmpeg_cmd, fps=2, width=640, idle_timeout=5, max_decoders=32, frame_timeout=10, max_missed_frames=3):
+        self.ffmpeg_cmd = ffmpeg_cmd
+        self.fps = fps
+        self.width = width
+        self.idle_timeout = idle_timeout
+        self.max_decoders = max_decoders
+        self.frame_timeout = frame_timeout
+        self.max_missed_frames = max_missed_frames
+        self._decoders = {}
+        self._idle_since = {}
+        self._lock = Lock()
+
+    def acquire(self, url):
+        with self._lock:
+            self._reap_locked()
+            decoder = self._decoders.get(url)
+            if decoder is None or not decoder.running:
+                if len(self._decoders) >= self.max_decoders and url not in self._decoders:
+                    raise RuntimeError('Too many live previews running')
+                decoder = CameraDecoder(url, self.ffmpeg_cmd(), self.fps, self.width, io_timeout=self.frame_timeout)
+                decoder.start()
+                self._decoders[url] = decoder
+            decoder.viewers += 1
+            self._idle_since.pop(url, None)
+            return decoder
+
+    def release(self, decoder):
+        with self._lock:
+            decoder.viewers = max(0, decoder.viewers - 1)
+            if self._decoders.get(decoder.url) is not decoder:
+                # Already replaced after it died; don't mark its successor idle
+                if decoder.viewers == 0:
+                    decoder.stop()
+                return
+            if decoder.viewers == 0:
+                self._idle_since[decoder.url] = time.time()
+        Thread(target=self._delayed_reap, daemon=True).start()
+
+    def _delayed_reap(self):
+        time.sleep(self.idle_timeout)
+        with self._lock:
+            self._reap_locked()
+
+    def _reap_locked(self):
+        now = time.time()
+        for url, since in list(self._idle_since.items()):
+            decoder = self._decoders.get(url)
+            if decoder is None or (decoder.viewers == 0 and now - since >= self.idle_timeout):
+                self._idle_since.pop(url, None)
+                if decoder:
+                    decoder.stop()
+                    self._decoders.pop(url, None)
+
+    def stream(self, decoder, boundary='frame'):
+        """
+        Generator of multipart MJPEG chunks for one viewer of an acquired decoder.
+        The caller acquires first (so startup errors surface before the response starts)
+        and releases when the response closes. The generator ends if the camera stalls: while
+        nothing is yielded the server never notices a disconnected client, so the viewer
+        would never be released.
+        """
+        sequence = 0
+        missed = 0
+        while True:
+            sequence, frame = decoder.wait_for_frame(sequence, timeout=self.frame_timeout)
+            if frame is None:
+                if not decoder.running:
+                    return
+                missed += 1
+                if missed >= self.max_missed_frames:
+                    decoder.fail(f'No frame for {self.frame_timeout * missed:g} seconds')
+                    return
+                continue
+            missed = 0
+            yield (f'--{boundary}\r\nContent-Type: image/jpeg\r\nContent-Length: {len(frame)}\r\n\r\n').encode() + frame + b'\r\n'
+
+    def status(self):
+        with self._lock:
+            return [{
+                'url': decoder.url,
+                'viewers': decoder.viewers,
+                'frames': decoder.sequence,
+                'running': decoder.running,
+                'error': decoder.error
+            } for decoder in self._decoders.values()]
+
+    def stop_all(self):
+        with self._lock:
+            for decoder in self._decoders.values():
+                decoder.stop()
+            self._decoders.clear()
+            self._idle_since.clear()
@@ -0,0 +1,158 @@
+import os
+import re
+import shutil
+import hashlib
+from datetime import datetime
+from threading import Lock
+
+
+MONITOR_PATTERN = re.compile(r'^monitor(\d+)\.yml$')
+
+
+class ConflictError(Exception):
+    """The file changed since the client loaded it; `etag` is the current one"""
+
+    def __init__(self, etag):
+        super().__init__('Configuration was modified elsewhere')
+        self.etag = etag
+
+
+class MonitorStore:
+    """
+    Manages every monitorN.yml in the OpenSurv config directory.
+    Each file has its own cached content/parse keyed on (mtime, size), an ETag,
+    and its own backup stream (monitorN_<timestamp>.yml) in the backup directory.
+    """
+
+    def __init__(self, config_dir, backup_dir):
+        self.config_dir = config_dir
+        self.backup_dir = backup_dir
+        self._cache = {}
+        self._lock = Lock()
+
+    def path(self, number):
+        return os.path.join(self.config_dir, f'monitor{int(number)}.yml')
+
+    def discover(self):
+        """Return the sorted monitor numbers that exist on disk"""
+        if not os.path.isdir(self.config_dir):
+            return []
+        numbers = []
+        for filename in os.listdir(self.config_dir):
+            match = MONITOR_PATTERN.match(filename)
+            if match:
+                numbers.append(int(match.group(1)))
+        return sorted(numbers)
+
+    def load(self, number):
+        """
+        Return the cached entry for a monitor, re-reading the file only when it changed.
+        Entry: { 'monitor', 'filename', 'content', 'etag', 'size', 'modified', 'valid', 'error', 'config' }
+        Returns None if the file does not exist.
+        """
+        path = self.path(number)
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            with self._lock:
+                self._cache.pop(number, None)
+            return None
+
+        key = (stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            entry = self._cache.get(number)
+            if entry and entry['_key'] == key:
+                return entry
+
+        with open(path, 'r', encoding='utf-8') as f:
+            content = f.read()
+        entry = self._build_entry(number, content, stat)
+        entry['_key'] = key
+        with self._lock:
+            self._cache[number] = entry
+        return entry
+
+    def _build_entry(self, number, content, stat):
+        config, error = self.validate(content)
+        return {
+            'monitor': number,
+            'filename': os.path.basename(self.path(number)),
+            'content': content,
+            'etag': self.etag(content),
+            'size': stat.st_size,
+            'modified': datetime.fromtimestamp(stat.st_mtime).isoformat(),
+            'valid': error is None,
+            'error': error,
+            'config': config
+        }
+
+    def etag(self, content):
+        return hashlib.sha1(content.encode('utf-8')).hexdigest()
+
+    def validate(self, content):
+        """Parse YAML content, returning (config, error)"""
+        try:
+            import yaml
+            return yaml.safe_load(content) or {}, None
+        except Exception as e:
+            return None, str(e)
+
+    def backup(self, number):
+        """Copy the current file into this monitor's backup stream"""
+        path = self.path(number)
+        if not os.path.exists(path):
+            return None
+        os.makedirs(self.backup_dir, exist_ok=True)
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        backup_file = os.path.join(self.backup_dir, f'monitor{int(number)}_{timestamp}.yml')
+        shutil.copy2(path, backup_file)
+        return backup_file
+
+    def save(self, number, content, expected_etag=None):
+        """
+        Back up the current file, then write the new content atomically.
+        With expected_etag, raises ConflictError if the file on disk no longer has that ETag;
+        the check and the write happen under one lock so concurrent saves can't both pass.
+        """
+        path = self.path(number)
+        if self.config_dir and not os.path.exists(self.config_dir):
+            os.makedirs(self.config_dir, exist_ok=True)
+
+        with self._lock:
+            if expected_etag and os.path.exists(path):
+                with open(path, 'r', encoding='utf-8') as f:
+                    current = self.etag(f.read())
+                if expected_etag.strip('"') != current:
+                    raise ConflictError(current)
+            self.backup(number)
+            temp_path = f'{path}.tmp'
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                f.write(content)
+            if os.path.exists(path):
+                shutil.copymode(path, temp_path)
+            os.replace(temp_path, path)
+            self._cache.pop(number, None)
+        return self.load(number)
+
+    def backups(self, number=None):
+        """List backup files, optionally only those belonging to one monitor"""
+        if not os.path.exists(self.backup_dir):
+            return []
+        prefix = f'monitor{int(number)}_' if number is not None else ''
+        items = []
+        for filename in sorted(os.listdir(self.backup_dir), reverse=True):
+            if filename.endswith('.yml') and filename.startswith(prefix):
+                stat = os.stat(os.path.join(self.backup_dir, filename))
+                items.append({
+                    'filename': filename,
+                    'size': stat.st_size,
+                    'modified': datetime.fromtimestamp(stat.st_mtime).isoformat()
+                })
+        return items
+
+    def summary(self, entry, include_content=False):
+        """Public view of a cache entry (no internal keys or parsed config)"""
+        keys = ['monitor', 'filename', 'etag', 'size', 'modified', 'valid', 'error']
+        if include_content:
+            keys.append('content')
+        return {k: entry[k] for k in keys}
@@ -0,0 +1,179 @@
+import os
+import json
+import time
+import hashlib
+import subprocess
+from collections import deque
+from threading import Thread, Lock
+from concurrent.futures import Future
+
+
+def canonical_hash(config):
+    """Hash of the parsed config; comments, key order and formatting don't affect it"""
+    payload = json.dumps(config, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def semantic_diff(old, new, path=''):
+    """List the paths whose values differ between two parsed configs"""
+    if isinstance(old, dict) and isinstance(new, dict):
+        changes = []
+        for key in sorted(set(old) | set(new), key=str):
+            child = f'{path}.{key}' if path else str(key)
+            if key not in old:
+                changes.append({'path': child, 'change': 'added'})
+            elif key not in new:
+                changes.append({'path': child, 'change': 'removed'})
+            else:
+                changes.extend(semantic_diff(old[key], new[key], child))
+        return changes
+    if isinstance(old, list) and isinstance(new, list):
+        changes = []
+        for index in range(max(len(old), len(new))):
+            child = f'{path}[{index}]'
+            if index >= len(old):
+                changes.append({'path': child, 'change': 'added'})
+            elif index >= len(new):
+                changes.append({'path': child, 'change': 'removed'})
+            else:
+                changes.extend(semantic_diff(old[index], new[index], child))
+        return changes
+    return [] if old == new else [{'path': path, 'change': 'modified'}]
+
+
+class RestartManager:
+    """
+    Restarts the display service only when the effective config changed.
+    The canonical hash of the last applied config is stored in `state_file`; requests
+    that arrive within `debounce` seconds of each other share a single restart, and
+    every restart is timed until the service reports active again. Restarts never
+    overlap, and the no-op check is repeated once it's this restart's turn.
+    """
+
+    def __init__(self, get_config, state_file, service='lightdm.service', debounce=2.0, health_timeout=60):
+        self.get_config = get_config
+        self.state_file = state_file
+        self.service = service
+        self.debounce = debounce
+        self.health_timeout = health_timeout
+        self.history = deque(maxlen=20)
+        self._pending = None
+        self._coalesced = 0
+        self._force = False
+        self._lock = Lock()
+        self._restart_lock = Lock()
+
+    # ----- Applied state -----
+
+    def load_state(self):
+        if os.path.exists(self.state_file):
+            try:
+                with open(self.state_file, 'r') as f:
+                    return json.load(f)
+            except Exception:
+                pass
+        return {'hash': None, 'config': None, 'applied_at': None}
+
+    def save_state(self, config, config_hash):
+        temp_path = f'{self.state_file}.tmp'
+        with open(temp_path, 'w') as f:
+            json.dump({'hash': config_hash, 'config': config, 'applied_at': time.time()}, f)
+        os.replace(temp_path, self.state_file)
+
+    def status(self):
+        """Compare the config on disk with what was last applied"""
+        state = self.load_state()
+        config = self.get_config()
+        config_hash = canonical_hash(config)
+        return {
+            'applied_hash': state['hash'],
+            'current_hash': config_hash,
+            'needs_restart': state['hash'] != config_hash,
+            'changes': semantic_diff(state['config'], config) if state['config'] is not None else None,
+            'applied_at': state['applied_at'],
+            'pending': self._pending is not None,
+            'history': list(self.history)
+        }
+
+    # ----- Restarting -----
+
+    def request(self, force=False):
+        """
+        Ask for a restart. Returns immediately if nothing OpenSurv reads has changed,
+        otherwise joins (or schedules) the debounced restart and waits for its result.
+        """
+        state = self.load_state()
+        config = self.get_config()
+        config_hash = canonical_hash(config)
+        if not force and state['hash'] == config_hash:
+            return {'success': True, 'restarted': False, 'message': 'Configuration unchanged, restart skipped'}
+
+        with self._lock:
+            if self._pending is None:
+                self._pending = Future()
+                self._coalesced = 0
+                self._force = False
+                Thread(target=self._run_pending, daemon=True).start()
+            else:
+                self._coalesced += 1
+            self._force = self._force or force
+            future = self._pending
+        return future.result()
+
+    def _run_pending(self):
+        time.sleep(self.debounce)
+        # Close the window before reading the config: a request arriving from here on
+        # may carry changes this restart won't see, so it has to schedule its own
+        with self._lock:
+            future = self._pending
+            coalesced = self._coalesced
+            force = self._force
+            self._pending = None
+        try:
+            with self._restart_lock:
+                result = self._restart(force)
+        except Exception as e:
+            result = {'success': False, 'restarted': False, 'error': str(e)}
+        result['coalesced'] = coalesced
+        future.set_result(result)
+
+    def _restart(self, force=False):
+        # Read the config again: later requests in the debounce window may have changed it,
+        # and a restart that ran while this one waited may already have applied it
+        config = self.get_config()
+        config_hash = canonical_hash(config)
+        if not force and self.load_state()['hash'] == config_hash:
+            return {'success': True, 'restarted': False, 'message': 'Configuration unchanged, restart skipped'}
+
+        start = time.time()
+        result = subprocess.run(['sudo', 'systemctl', 'restart', self.service], capture_output=True, text=True, timeout=self.health_timeout)
+        if result.returncode != 0:
+            return {'success': False, 'restarted': False, 'error': f'Failed to restart: {result.stderr}'}
+        restart_seconds = time.time() - start
+
+        healthy = self._wait_until_active()
+        time_to_healthy = round(time.time() - start, 2) if healthy else None
+        self.history.append({
+            'at': start,
+            'restart_seconds': round(restart_seconds, 2),
+            'time_to_healthy': time_to_healthy,
+            'healthy': healthy
+        })
+        if healthy:
+            self.save_state(config, config_hash)
+        return {
+            'success': healthy,
+            'restarted': True,
+            'message': 'OpenSurv restarted successfully' if healthy else f'{self.service} did not become active',
+            'restart_seconds': round(restart_seconds, 2),
+            'time_to_healthy': time_to_healthy
+        }
+
+    def _wait_until_active(self):
+        deadline = time.time() + self.health_timeout
+        while time.time() < deadline:
+            result = subprocess.run(['systemctl', 'is-active', self.service], capture_output=True, text=True)
+            if result.stdout.strip() == 'active':
+                return True
+            time.sleep(0.25)
+        return False
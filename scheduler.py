@@ -0,0 +1,89 @@
+import os
+import time
+from threading import Thread, Event, Lock
+from concurrent.futures import ThreadPoolExecutor
+
+
+class WarmCacheScheduler:
+    """
+    Background job that keeps screenshots for every configured camera fresh.
+    Runs a pass at startup and then every `warm_cache_interval` seconds (read from
+    settings each time, so it can be switched on or off without a restart).
+    Captures run at idle CPU priority with a small worker budget, and the job waits
+    whenever the load average per core is above `warm_cache_max_load`, so OpenSurv's
+    own video decoding on the same machine always wins.
+    """
+
+    def __init__(self, capturer, get_urls, get_settings):
+        self.capturer = capturer
+        self.get_urls = get_urls
+        self.get_settings = get_settings
+        self._wake = Event()
+        self._lock = Lock()
+        self._thread = None
+        self.status = {'running': False, 'last_run': None, 'last_duration': None,
+                       'refreshed': 0, 'failed': 0, 'skipped': 0, 'backoffs': 0}
+
+    def start(self):
+        if self._thread is None:
+            self._thread = Thread(target=self._loop, daemon=True)
+            self._thread.start()
+
+    def trigger(self):
+        """Start a pass now instead of waiting for the interval"""
+        self._wake.set()
+
+    def _loop(self):
+        while True:
+            settings = self.get_settings()
+            if settings.get('warm_cache_enabled'):
+                try:
+                    self.run_once(settings)
+                except Exception as e:
+                    print(f"Warm cache pass failed: {e}")
+            self._wake.wait(max(30, settings.get('warm_cache_interval', 600)))
+            self._wake.clear()
+
+    def _cpu_busy(self, max_load):
+        """True if the 1-minute load average per core is above max_load (unknown counts as idle)"""
+        try:
+            return os.getloadavg()[0] / (os.cpu_count() or 1) > max_load
+        except (AttributeError, OSError):
+            return False
+
+    def _wait_for_idle(self, max_load):
+        delay = 5
+        while self._cpu_busy(max_load):
+            with self._lock:
+                self.status['backoffs'] += 1
+            time.sleep(delay)
+            delay = min(delay * 2, 120)
+
+    def _refresh(self, url, settings):
+        self._wait_for_idle(settings.get('warm_cache_max_load', 0.75))
+        filename = self.capturer.capture(url, max_age=settings.get('warm_cache_max_age', 900), low_priority=True)
+        with self._lock:
+            self.status['refreshed' if filename else 'failed'] += 1
+
+    def run_once(self, settings):
+        max_age = settings.get('warm_cache_max_age', 900)
+        urls = list(dict.fromkeys(self.get_urls()))
+        ages = {url: self.capturer.age(url) for url in urls}
+        stale = [url for url in urls if ages[url] is None or ages[url] > max_age]
+
+        start = time.time()
+        with self._lock:
+            self.status.update({'running': True, 'refreshed': 0, 'failed': 0,
+                                'skipped': len(urls) - len(stale), 'backoffs': 0})
+        try:
+            workers = max(1, int(settings.get('warm_cache_concurrency', 1)))
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                list(executor.map(lambda url: self._refresh(url, settings), stale))
+        finally:
+            with self._lock:
+                self.status.update({'running': False, 'last_run': start,
+                                    'last_duration': round(time.time() - start, 1)})
+
+    def get_status(self):
+        with self._lock:
+            return dict(self.status)
@@ -1,7 +1,7 @@
 #!/usr/bin/env python3
 """
 Tonys OpenSurv Manager 1.2 - Backend Server
-Provides API endpoints for managing monitor1.yml and restarting OpenSurv
+Provides API endpoints for managing monitorN.yml files and restarting OpenSurv
 """
 
 import sys
@@ -9,10 +9,21 @@ import subprocess
 import os
 import shutil
 import json
-from datetime import datetime
+import copy
 import time
 import logging
 from updater import GitHubUpdater
+from layout import LayoutEngine, parse_resolution
+from monitors import MonitorStore, ConflictError, MONITOR_PATTERN
+from fleet import FleetManager
+from live import LivePreviewHub
+from capture import ScreenshotCapturer
+from discovery import RTSPScanner, parse_network
+from analysis import FrameAnalyzer
+import importer
+from watcher import FileWatcher, EventBroadcaster
+from scheduler import WarmCacheScheduler
+from restart import RestartManager
 
 
 VERSION = "1.6.1"
@@ -143,7 +154,7 @@ check_ffmpeg()
 
 # Import dependencies AFTER check/installation
 try:
-    from flask import Flask, request, jsonify, send_from_directory
+    from flask import Flask, Response, request, jsonify, send_from_directory
     from flask_cors import CORS
 except ImportError as e:
     print(f"Critical Error: Failed to import dependencies: {e}")
@@ -156,6 +167,7 @@ CORS(app)
 log = logging.getLogger('werkzeug')
 log.setLevel(logging.ERROR)
 updater = GitHubUpdater(REPO_OWNER, REPO_NAME, VERSION)
+layout_engine = LayoutEngine()
 
 # Configuration
 if os.name == 'posix':
@@ -163,29 +175,58 @@ if os.name == 'posix':
 else:
     CONFIG_FILE = os.path.join('config', 'monitor1.yml') # Local for Windows dev
 SETTINGS_FILE = 'gui_settings.json'
+APPLIED_STATE_FILE = 'applied_config.json'  # Canonical form of the config OpenSurv was last restarted with
 BACKUP_DIR = 'backups'
+monitor_store = MonitorStore(os.path.dirname(CONFIG_FILE), BACKUP_DIR)
 
 # Default settings
 DEFAULT_SETTINGS = {
-    'port': 6453
+    'port': 6453,
+    'fleet_hosts': [],
+    'screenshot_max_age': 10,  # Seconds a screenshot counts as fresh enough to skip re-capturing
+    'frame_analysis': True,  # Flag black/frozen/covered feeds after capture (needs numpy)
+    'warm_cache_enabled': False,  # Pre-capture screenshots in the background
+    'warm_cache_interval': 600,  # Seconds between warm cache passes
+    'warm_cache_max_age': 900,  # Screenshots older than this are refreshed
+    'warm_cache_concurrency': 1,
+    'warm_cache_max_load': 0.75  # Back off while 1-min load average per core is above this
 }
 
-def load_settings():
+_settings_cache = None
+
+def read_settings_file():
+    """Settings from disk merged over the defaults, or None if the file can't be parsed"""
     if os.path.exists(SETTINGS_FILE):
         try:
             with open(SETTINGS_FILE, 'r') as f:
                 return {**DEFAULT_SETTINGS, **json.load(f)}
-        except:
-            return DEFAULT_SETTINGS
-    return DEFAULT_SETTINGS
+        except Exception as e:
+            print(f"Could not read {SETTINGS_FILE}: {e}")
+            return None
+    return dict(DEFAULT_SETTINGS)
+
+def load_settings():
+    """Settings are kept in memory and re-read only when the file watcher sees a change"""
+    global _settings_cache
+    if _settings_cache is None:
+        _settings_cache = read_settings_file() or dict(DEFAULT_SETTINGS)
+    return copy.deepcopy(_settings_cache)
 
 def save_settings(settings):
-    with open(SETTINGS_FILE, 'w') as f:
+    global _settings_cache
+    # Write to a temp file and rename so the watcher never sees a half-written file
+    temp_path = f'{SETTINGS_FILE}.tmp'
+    with open(temp_path, 'w') as f:
         json.dump(settings, f, indent=4)
+    os.replace(temp_path, SETTINGS_FILE)
+    _settings_cache = copy.deepcopy(settings)
 
 # Ensure backup directory exists
 os.makedirs(BACKUP_DIR, exist_ok=True)
 
+START_TIME = time.time()
+fleet = FleetManager(load_settings().get('fleet_hosts', []))
+
 @app.route('/')
 def index():
     return send_from_directory('web', 'index.html')
@@ -196,37 +237,125 @@ def serve_static(path):
 
 @app.route('/api/config', methods=['GET'])
 def get_config():
+    return get_monitor(1)
+
+@app.route('/api/config', methods=['POST'])
+def save_config():
+    return save_monitor(1)
+
+@app.route('/api/monitors', methods=['GET'])
+def list_monitors():
+    """List every monitorN.yml with its ETag and validation state"""
     try:
-        if os.path.exists(CONFIG_FILE):
-            with open(CONFIG_FILE, 'r', encoding='utf-8') as f:
-                content = f.read()
-            return jsonify({'success': True, 'content': content})
-        return jsonify({'success': False, 'error': 'Configuration file not found'}), 404
+        monitors = []
+        for number in monitor_store.discover():
+            entry = monitor_store.load(number)
+            if entry:
+                monitors.append(monitor_store.summary(entry))
+        return jsonify({'success': True, 'monitors': monitors})
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
-@app.route('/api/config', methods=['POST'])
-def save_config():
+@app.route('/api/monitors/all', methods=['GET'])
+def get_all_monitors():
+    """Return every monitor's content in one response so the UI doesn't need N requests"""
+    try:
+        monitors = []
+        for number in monitor_store.discover():
+            entry = monitor_store.load(number)
+            if entry:
+                monitors.append(monitor_store.summary(entry, include_content=True))
+        return jsonify({'success': True, 'monitors': monitors})
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/api/monitors/<int:number>', methods=['GET'])
+def get_monitor(number):
+    try:
+        entry = monitor_store.load(number)
+        if not entry:
+            return jsonify({'success': False, 'error': 'Configuration file not found'}), 404
+        etag = f'"{entry["etag"]}"'
+        if request.headers.get('If-None-Match') == etag:
+            return '', 304, {'ETag': etag}
+        response = jsonify({'success': True, **monitor_store.summary(entry, include_content=True)})
+        response.headers['ETag'] = etag
+        return response
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/api/monitors/<int:number>', methods=['POST'])
+def save_monitor(number):
     try:
         data = request.get_json()
         content = data.get('content')
         if not content:
             return jsonify({'success': False, 'error': 'No content provided'}), 400
-        # Ensure config directory exists
-        config_dir = os.path.dirname(CONFIG_FILE)
-        if config_dir and not os.path.exists(config_dir):
-            os.makedirs(config_dir, exist_ok=True)
-
-        if os.path.exists(CONFIG_FILE):
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            backup_file = os.path.join(BACKUP_DIR, f'monitor1_{timestamp}.yml')
-            shutil.copy2(CONFIG_FILE, backup_file)
-        with open(CONFIG_FILE, 'w', encoding='utf-8') as f:
-            f.write(content)
-        return jsonify({'success': True, 'message': 'Configuration saved successfully'})
+
+        # Optional optimistic locking: reject the save if the file changed since the client loaded it
+        expected = request.headers.get('If-Match') or data.get('etag')
+        entry = monitor_store.save(number, content, expected_etag=expected)
+        response = jsonify({'success': True, 'message': 'Configuration saved successfully', 'etag': entry['etag'], 'valid': entry['valid']})
+        response.headers['ETag'] = f'"{entry["etag"]}"'
+        return response
+    except ConflictError as e:
+        return jsonify({'success': False, 'error': str(e), 'etag': e.etag}), 412
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
+@app.route('/api/monitors/<int:number>/validate', methods=['GET'])
+def validate_monitor(number):
+    entry = monitor_store.load(number)
+    if not entry:
+        return jsonify({'success': False, 'error': 'Configuration file not found'}), 404
+    if entry['valid']:
+        return jsonify({'success': True, 'message': 'Configuration is valid'})
+    return jsonify({'success': False, 'error': entry['error']}), 400
+
+events = EventBroadcaster()
+_published_etags = {}
+
+def on_file_changed(path):
+    """Refresh the in-memory copy of a changed file and tell connected browsers"""
+    global _settings_cache
+    if os.path.abspath(path) == os.path.abspath(SETTINGS_FILE):
+        settings = read_settings_file()
+        # Keep the last good settings while the file is being edited by hand
+        if settings is None:
+            return
+        _settings_cache = settings
+        events.publish({'type': 'settings'})
+        return
+    match = MONITOR_PATTERN.match(os.path.basename(path))
+    if not match:
+        return
+    number = int(match.group(1))
+    entry = monitor_store.load(number)
+    etag = entry['etag'] if entry else None
+    # Saves can fire several inotify events; only announce real content changes
+    if _published_etags.get(number, '') == etag:
+        return
+    _published_etags[number] = etag
+    events.publish({
+        'type': 'config',
+        'monitor': number,
+        'etag': etag,
+        'valid': entry['valid'] if entry else None,
+        'deleted': entry is None
+    })
+
+file_watcher = FileWatcher(
+    [monitor_store.config_dir or '.', os.path.dirname(os.path.abspath(SETTINGS_FILE))],
+    lambda path: MONITOR_PATTERN.match(os.path.basename(path)) or os.path.abspath(path) == os.path.abspath(SETTINGS_FILE),
+    on_file_changed
+)
+
+@app.route('/api/events', methods=['GET'])
+def event_stream():
+    """Server-Sent Events channel for config/settings change notifications"""
+    return Response(events.stream(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
 @app.route('/api/settings', methods=['GET'])
 def get_settings():
     return jsonify({'success': True, 'settings': load_settings()})
@@ -240,24 +369,55 @@ def update_settings():
         # Update settings
         if 'port' in data:
             settings['port'] = int(data['port'])
+        if 'screenshot_max_age' in data:
+            settings['screenshot_max_age'] = max(0, int(data['screenshot_max_age']))
+        if 'frame_analysis' in data:
+            settings['frame_analysis'] = bool(data['frame_analysis'])
+        if 'warm_cache_enabled' in data:
+            settings['warm_cache_enabled'] = bool(data['warm_cache_enabled'])
+        for key in ('warm_cache_interval', 'warm_cache_max_age', 'warm_cache_concurrency'):
+            if key in data:
+                settings[key] = max(1, int(data[key]))
+        if 'warm_cache_max_load' in data:
+            settings['warm_cache_max_load'] = float(data['warm_cache_max_load'])
             
         save_settings(settings)
+        if settings.get('warm_cache_enabled'):
+            warm_cache.trigger()
         return jsonify({'success': True, 'message': 'Settings saved. Restart required for some changes.'})
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
+def effective_config():
+    """Parsed contents of every monitor file, i.e. what OpenSurv actually reads"""
+    config = {}
+    for number in monitor_store.discover():
+        entry = monitor_store.load(number)
+        if entry:
+            config[f'monitor{number}'] = entry['config'] if entry['valid'] else {'_invalid': entry['etag']}
+    return config
+
+restart_manager = RestartManager(effective_config, APPLIED_STATE_FILE)
+
 @app.route('/api/restart', methods=['POST'])
 def restart_opensurv():
     try:
         if os.name == 'posix':
-            result = subprocess.run(['sudo', 'systemctl', 'restart', 'lightdm.service'], capture_output=True, text=True, timeout=10)
-            if result.returncode == 0:
-                return jsonify({'success': True, 'message': 'OpenSurv restarted successfully'})
-            return jsonify({'success': False, 'error': f'Failed to restart: {result.stderr}'}), 500
+            data = request.get_json(silent=True) or {}
+            result = restart_manager.request(force=bool(data.get('force')))
+            return jsonify(result), 200 if result['success'] else 500
         return jsonify({'success': False, 'error': 'Restart is only supported on Linux'}), 400
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
+@app.route('/api/restart/status', methods=['GET'])
+def restart_status():
+    """Whether the config on disk differs from what OpenSurv is running, plus restart timings"""
+    try:
+        return jsonify({'success': True, **restart_manager.status()})
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
 @app.route('/api/reboot', methods=['POST'])
 def reboot_system():
     try:
@@ -269,6 +429,99 @@ def reboot_system():
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
+@app.route('/api/health', methods=['GET'])
+def get_health():
+    """Lightweight status used by fleet mode to poll remote instances"""
+    monitors = []
+    for number in monitor_store.discover():
+        entry = monitor_store.load(number)
+        if entry:
+            monitors.append({'monitor': number, 'etag': entry['etag'], 'valid': entry['valid']})
+    feeds = analyzer.latest()
+    return jsonify({
+        'success': True,
+        'version': VERSION,
+        'platform': os.name,
+        'uptime': round(time.time() - START_TIME),
+        'monitors': monitors,
+        'feeds': feeds,
+        'problem_feeds': sorted(url for url, result in feeds.items() if result['status'] != 'ok')
+    })
+
+def save_fleet_hosts():
+    settings = load_settings()
+    settings['fleet_hosts'] = fleet.hosts()
+    save_settings(settings)
+
+def selected_fleet_hosts(data):
+    return fleet.select(data.get('hosts'), data.get('group'))
+
+@app.route('/api/fleet/hosts', methods=['GET'])
+def list_fleet_hosts():
+    return jsonify({'success': True, 'hosts': fleet.hosts()})
+
+@app.route('/api/fleet/hosts', methods=['POST'])
+def add_fleet_host():
+    try:
+        data = request.get_json()
+        name = (data.get('name') or '').strip()
+        url = (data.get('url') or '').strip()
+        if not name or not url:
+            return jsonify({'success': False, 'error': 'Name and URL are required'}), 400
+        fleet.add_host(name, url, data.get('group') or 'default')
+        save_fleet_hosts()
+        return jsonify({'success': True, 'hosts': fleet.hosts()})
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/api/fleet/hosts/<name>', methods=['DELETE'])
+def remove_fleet_host(name):
+    try:
+        if not fleet.remove_host(name):
+            return jsonify({'success': False, 'error': 'Host not found'}), 404
+        save_fleet_hosts()
+        return jsonify({'success': True, 'hosts': fleet.hosts()})
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/api/fleet/health', methods=['GET'])
+def fleet_health():
+    try:
+        hosts = fleet.select(request.args.getlist('host'), request.args.get('group'))
+        return jsonify({'success': True, 'results': fleet.health(hosts)})
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/api/fleet/configs', methods=['POST'])
+def fleet_configs():
+    try:
+        data = request.get_json() or {}
+        results = fleet.fetch_configs(selected_fleet_hosts(data), data.get('monitor', 1))
+        return jsonify({'success': True, 'results': results})
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/api/fleet/push', methods=['POST'])
+def fleet_push():
+    """Push a full config, or a single camera URL change, to the selected hosts in parallel"""
+    try:
+        data = request.get_json() or {}
+        hosts = selected_fleet_hosts(data)
+        if not hosts:
+            return jsonify({'success': False, 'error': 'No matching hosts'}), 400
+        monitor = data.get('monitor', 1)
+
+        if data.get('old_url') and data.get('new_url'):
+            results = fleet.push_camera_change(hosts, data['old_url'], data['new_url'], monitor)
+        elif data.get('content'):
+            results = fleet.push_config(hosts, data['content'], monitor)
+        else:
+            return jsonify({'success': False, 'error': 'Provide content, or old_url and new_url'}), 400
+
+        return jsonify({'success': all(r['success'] for r in results.values()), 'results': results})
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
 @app.route('/screenshots/<path:filename>')
 def serve_screenshot(filename):
     return send_from_directory('screenshots', filename)
@@ -281,6 +534,51 @@ def get_ffmpeg_command():
             return local_path
     return 'ffmpeg'
 
+live_hub = LivePreviewHub(get_ffmpeg_command)
+
+@app.route('/api/live', methods=['GET'])
+def live_preview():
+    """Low-fps MJPEG stream; every viewer of a camera shares the same ffmpeg decoder"""
+    url = request.args.get('url')
+    if not url:
+        return jsonify({'success': False, 'error': 'No URL provided'}), 400
+    try:
+        decoder = live_hub.acquire(url)
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+    response = Response(live_hub.stream(decoder), mimetype='multipart/x-mixed-replace; boundary=frame',
+                        headers={'Cache-Control': 'no-cache, no-store'})
+    # Runs on normal end and on client disconnect, even if the stream never started
+    response.call_on_close(lambda: live_hub.release(decoder))
+    return response
+
+@app.route('/api/live/frame', methods=['GET'])
+def live_frame():
+    """Latest single JPEG from the shared decoder, for clients that poll instead of streaming"""
+    url = request.args.get('url')
+    if not url:
+        return jsonify({'success': False, 'error': 'No URL provided'}), 400
+    try:
+        decoder = live_hub.acquire(url)
+        try:
+            sequence, frame = decoder.latest()
+            if frame is None:
+                sequence, frame = decoder.wait_for_frame(0, timeout=15)
+        finally:
+            live_hub.release(decoder)
+        if frame is None:
+            return jsonify({'success': False, 'error': decoder.error or 'No frame received'}), 504
+        return Response(frame, mimetype='image/jpeg', headers={'Cache-Control': 'no-cache, no-store'})
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/api/live/status', methods=['GET'])
+def live_status():
+    return jsonify({'success': True, 'decoders': live_hub.status()})
+
+capturer = ScreenshotCapturer(os.path.join(os.getcwd(), 'screenshots'), get_ffmpeg_command)
+analyzer = FrameAnalyzer(get_ffmpeg_command)
+
 @app.route('/api/screenshots/capture', methods=['POST'])
 def capture_screenshots():
     try:
@@ -290,71 +588,138 @@ def capture_screenshots():
         if not streams:
             return jsonify({'success': False, 'error': 'No streams provided'}), 400
 
-        # Ensure screenshots directory exists
-        screenshot_dir = os.path.join(os.getcwd(), 'screenshots')
-        if not os.path.exists(screenshot_dir):
-            os.makedirs(screenshot_dir)
-
+        settings = load_settings()
+        max_age = data.get('max_age')
+        if max_age is None:
+            max_age = settings.get('screenshot_max_age', 0)
+        try:
+            max_age = max(0, int(max_age))
+        except (TypeError, ValueError):
+            return jsonify({'success': False, 'error': f'Invalid max_age: {max_age}'}), 400
         results = {}
-        import hashlib
-        
+        captured = []
         for stream in streams:
             url = stream.get('url')
             if not url:
                 continue
-                
-            # Create a safe filename hash from URL
-            url_hash = hashlib.md5(url.encode()).hexdigest()
-            filename = f"cam_{url_hash}.jpg"
-            filepath = os.path.join(screenshot_dir, filename)
-            
-            # Simple RTSP frame capture using ffmpeg
-            # -y: overwrite
-            # -rtsp_transport tcp: reliable transport
-            # -i url: input
-            # -frames:v 1: grab 1 frame
-            # -q:v 2: quality
-            # Try TCP first (Reliable)
-            ffmpeg_cmd = get_ffmpeg_command()
-            cmd_tcp = [
-                ffmpeg_cmd, '-y', '-nostdin',
-                '-rtsp_transport', 'tcp',
-                '-i', url,
-                '-frames:v', '1',
-                '-q:v', '5', 
-                filepath
-            ]
-            
-            success = False
-            try:
-                # 15 second timeout for slow streams (Unifi, etc)
-                subprocess.run(cmd_tcp, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, timeout=15)
-                if os.path.exists(filepath) and os.path.getsize(filepath) > 0:
-                    success = True
-            except (subprocess.TimeoutExpired, Exception) as e:
-                print(f"TCP capture failed for {url}: {e}")
-
-            # Fallback to UDP if TCP failed
-            if not success:
-                print(f"Retrying with UDP for {url}...")
-                cmd_udp = [
-                    ffmpeg_cmd, '-y', '-nostdin',
-                    '-i', url,
-                    '-frames:v', '1',
-                    '-q:v', '5', 
-                    filepath
-                ]
-                try:
-                    subprocess.run(cmd_udp, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, timeout=15)
-                    if os.path.exists(filepath) and os.path.getsize(filepath) > 0:
-                        success = True
-                except Exception as e:
-                    print(f"UDP capture failed for {url}: {e}")
-
-            if success:
+            fresh = not (max_age and capturer.cached(url, max_age))
+            filename = capturer.capture(url, max_age=max_age)
+            if filename:
                 results[url] = filename
+                if fresh:
+                    captured.append(url)
 
-        return jsonify({'success': True, 'screenshots': results})
+        response = {'success': True, 'screenshots': results}
+        if data.get('analyze', settings.get('frame_analysis')) and analyzer.available:
+            # Only frames that were just re-captured are re-analysed, off the request path;
+            # the last known results are returned and /api/health picks up the new ones
+            analyzer.submit(captured)
+            latest = analyzer.latest()
+            response['analysis'] = {url: latest[url] for url in results if url in latest}
+        return jsonify(response)
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+def configured_stream_urls():
+    """Every enabled stream URL across all monitor files"""
+    urls = []
+    for number in monitor_store.discover():
+        entry = monitor_store.load(number)
+        screens = ((entry or {}).get('config') or {}).get('essentials', {}).get('screens') or []
+        for screen in screens:
+            for stream in (screen or {}).get('streams') or []:
+                if isinstance(stream, dict) and stream.get('url') and not stream.get('disabled'):
+                    urls.append(stream['url'])
+    return urls
+
+warm_cache = WarmCacheScheduler(capturer, configured_stream_urls, load_settings)
+
+@app.route('/api/warmcache', methods=['GET'])
+def warm_cache_status():
+    settings = load_settings()
+    return jsonify({'success': True, 'enabled': settings.get('warm_cache_enabled', False), 'status': warm_cache.get_status()})
+
+@app.route('/api/warmcache/run', methods=['POST'])
+def warm_cache_run():
+    if not load_settings().get('warm_cache_enabled'):
+        return jsonify({'success': False, 'error': 'Warm cache is disabled in settings'}), 400
+    warm_cache.trigger()
+    return jsonify({'success': True, 'message': 'Warm cache pass started'})
+
+@app.route('/api/cameras/import', methods=['POST'])
+def import_cameras():
+    """
+    Bulk-import cameras from a CSV (header row with url,name,screen,alternate_urls,disabled)
+    or NDJSON upload, sent as a multipart 'file' or as the raw request body.
+    The upload is parsed row by row; valid new URLs are assigned to screens and written
+    to the monitor file in one save. ?dry_run=1 returns the diff without saving.
+    """
+    try:
+        monitor = request.args.get('monitor', 1, type=int)
+        columns = request.args.get('columns', 2, type=int)
+        rows = request.args.get('rows', type=int)
+        dry_run = request.args.get('dry_run', '').lower() in ('1', 'true', 'yes')
+
+        upload = request.files.get('file')
+        if upload:
+            stream, name, content_type = upload.stream, upload.filename or '', upload.mimetype or ''
+        else:
+            stream, name, content_type = request.stream, '', request.mimetype or ''
+        fmt = request.args.get('format')
+        if not fmt:
+            fmt = 'ndjson' if name.endswith(('.ndjson', '.jsonl')) or 'json' in content_type else 'csv'
+
+        entry = monitor_store.load(monitor)
+        content = entry['content'] if entry else ''
+        config = entry['config'] if entry else {}
+        if entry and not entry['valid']:
+            return jsonify({'success': False, 'error': f'Current configuration is invalid: {entry["error"]}'}), 400
+
+        known = importer.existing_urls(content)
+        streams, errors, duplicates = [], [], []
+        for line_number, row in importer.iter_rows(stream, fmt):
+            camera, error = importer.normalize_row(row)
+            if error:
+                errors.append({'line': line_number, 'error': error})
+            elif camera['url'] in known:
+                duplicates.append({'line': line_number, 'url': camera['url']})
+            else:
+                known.add(camera['url'])
+                streams.append(camera)
+
+        summary = {'imported': len(streams), 'errors': errors, 'duplicates': duplicates}
+        if not streams:
+            return jsonify({'success': True, 'saved': False, 'diff': '', **summary})
+
+        assignments, screen_count = importer.plan_import(config, streams, columns, rows)
+        new_content = importer.apply_import(content, assignments, columns)
+
+        new_config, error = monitor_store.validate(new_content)
+        if error:
+            return jsonify({'success': False, 'error': f'Import produced invalid YAML: {error}'}), 500
+        # The text edit must put exactly the planned cameras on each screen (disabled ones are commented out)
+        counts = importer.stream_counts(config)
+        expected_counts = counts + [0] * (screen_count - len(counts))
+        for index, items in assignments.items():
+            expected_counts[index] += sum(not item['disabled'] for item in items)
+        if importer.stream_counts(new_config) != expected_counts:
+            return jsonify({'success': False, 'error': 'Could not place every camera on its screen; import aborted'}), 500
+
+        summary['screens'] = {str(index + 1): len(items) for index, items in assignments.items()}
+        summary['diff'] = importer.diff(content, new_content, f'monitor{monitor}.yml')
+        if dry_run:
+            return jsonify({'success': True, 'saved': False, **summary})
+
+        expected = request.headers.get('If-Match')
+        if expected and entry and expected.strip('"') != entry['etag']:
+            raise ConflictError(entry['etag'])
+        # The import was planned against this snapshot, so it must still be the file on disk
+        saved = monitor_store.save(monitor, new_content, expected_etag=entry['etag'] if entry else None)
+        return jsonify({'success': True, 'saved': True, 'etag': saved['etag'], **summary})
+    except ConflictError as e:
+        return jsonify({'success': False, 'error': str(e), 'etag': e.etag}), 412
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
@@ -367,30 +732,82 @@ def check_screenshots():
         if not streams:
             return jsonify({'success': False, 'error': 'No streams provided'}), 400
 
-        screenshot_dir = os.path.join(os.getcwd(), 'screenshots')
-        if not os.path.exists(screenshot_dir):
-             return jsonify({'success': True, 'screenshots': {}})
-
         results = {}
-        import hashlib
-        
         for stream in streams:
             url = stream.get('url')
             if not url:
                 continue
-                
-            url_hash = hashlib.md5(url.encode()).hexdigest()
-            filename = f"cam_{url_hash}.jpg"
-            filepath = os.path.join(screenshot_dir, filename)
-            
-            if os.path.exists(filepath):
-                 results[url] = filename
+            filename = capturer.cached(url)
+            if filename:
+                results[url] = filename
 
         return jsonify({'success': True, 'screenshots': results})
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
 
+@app.route('/api/discovery/scan', methods=['POST'])
+def discovery_scan():
+    """
+    Scan a subnet for RTSP/ONVIF cameras, streaming NDJSON events as they are found.
+    Credentials, when given, are used to authenticate DESCRIBE; candidates that answer
+    200 are validated by grabbing a frame through the screenshot capturer.
+    """
+    data = request.get_json() or {}
+    cidr = data.get('cidr')
+    if not cidr:
+        return jsonify({'success': False, 'error': 'No network provided'}), 400
+    username = data.get('username')
+    password = data.get('password', '')
+    validate = data.get('validate', True)
+    try:
+        parse_network(cidr)
+        # Clamped to the open-file limit by the scanner
+        concurrency = int(data.get('concurrency', 1024))
+    except (TypeError, ValueError) as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+    from queue import Queue
+    from threading import Thread
+    from concurrent.futures import ThreadPoolExecutor
+    from urllib.parse import quote
+
+    events = Queue()
+    validators = ThreadPoolExecutor(max_workers=2)
+
+    def validate_candidate(event):
+        url = event['url']
+        if username:
+            url = url.replace('rtsp://', f'rtsp://{quote(username, safe="")}:{quote(password, safe="")}@', 1)
+        filename = capturer.capture(url, max_age=60)
+        events.put({'type': 'validated', 'url': url, 'success': filename is not None, 'screenshot': filename})
+
+    def emit(event):
+        if event['type'] == 'done':
+            validators.shutdown(wait=True)
+        events.put(event)
+        if validate and event['type'] == 'candidate' and event['status'] == 200:
+            validators.submit(validate_candidate, event)
+
+    def run():
+        try:
+            scanner = RTSPScanner(concurrency=concurrency, username=username, password=password)
+            scanner.scan(cidr, emit, onvif=data.get('onvif', True))
+        except Exception as e:
+            events.put({'type': 'error', 'error': str(e)})
+            events.put({'type': 'done'})
+
+    Thread(target=run, daemon=True).start()
+
+    def generate():
+        while True:
+            event = events.get()
+            yield json.dumps(event) + '\n'
+            if event['type'] == 'done':
+                return
+
+    return Response(generate(), mimetype='application/x-ndjson', headers={'Cache-Control': 'no-cache'})
+
 @app.route('/api/update/check', methods=['GET'])
 def check_update():
     result = updater.check_for_updates()
@@ -434,21 +851,10 @@ def perform_update():
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @app.route('/api/backups', methods=['GET'])
-
 def list_backups():
     try:
-        backups = []
-        if os.path.exists(BACKUP_DIR):
-            for filename in sorted(os.listdir(BACKUP_DIR), reverse=True):
-                if filename.endswith('.yml'):
-                    filepath = os.path.join(BACKUP_DIR, filename)
-                    stat = os.stat(filepath)
-                    backups.append({
-                        'filename': filename,
-                        'size': stat.st_size,
-                        'modified': datetime.fromtimestamp(stat.st_mtime).isoformat()
-                    })
-        return jsonify({'success': True, 'backups': backups})
+        monitor = request.args.get('monitor', type=int)
+        return jsonify({'success': True, 'backups': monitor_store.backups(monitor)})
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
@@ -479,6 +885,51 @@ def validate_config():
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 400
 
+@app.route('/api/layout', methods=['GET', 'POST'])
+def get_layout():
+    """Compute tile rects, overlaps and gaps for every screen (saved monitor on GET, editor content on POST)"""
+    try:
+        data = request.get_json(silent=True) or {}
+        content = data.get('content')
+        if content is None:
+            entry = monitor_store.load(request.args.get('monitor', 1, type=int))
+            if not entry:
+                return jsonify({'success': False, 'error': 'Configuration file not found'}), 404
+            content, config, error = entry['content'], entry['config'], entry['error']
+        else:
+            config, error = monitor_store.validate(content)
+        if error:
+            return jsonify({'success': False, 'error': error}), 400
+
+        width, height = parse_resolution(content)
+        width = int(data.get('width') or request.args.get('width') or width)
+        height = int(data.get('height') or request.args.get('height') or height)
+        if width <= 0 or height <= 0:
+            return jsonify({'success': False, 'error': 'Invalid resolution'}), 400
+
+        return jsonify({'success': True, 'layout': layout_engine.compute(config, width, height)})
+    except (TypeError, ValueError) as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/api/layout/pack', methods=['POST'])
+def pack_layout():
+    """Suggest nr_of_columns and force_coordinates for N cameras"""
+    try:
+        data = request.get_json()
+        count = int(data.get('count', 0))
+        width = int(data.get('width', 1920))
+        height = int(data.get('height', 1080))
+        aspect = float(data.get('aspect', 16 / 9))
+        if count <= 0 or width <= 0 or height <= 0 or aspect <= 0:
+            return jsonify({'success': False, 'error': 'count, width, height and aspect must be positive'}), 400
+        return jsonify({'success': True, 'layout': layout_engine.pack(count, width, height, aspect)})
+    except (TypeError, ValueError) as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
 @app.route('/api/files/list', methods=['POST'])
 def list_directory():
     """List contents of a directory for the file browser"""
@@ -634,4 +1085,12 @@ if __name__ == '__main__':
         from threading import Timer
         Timer(1.5, lambda: webbrowser.open(f'http://localhost:{port}')).start()
 
+    # Background services only run in the reloader's serving process
+    if os.environ.get("WERKZEUG_RUN_MAIN"):
+        for number in monitor_store.discover():
+            entry = monitor_store.load(number)
+            _published_etags[number] = entry['etag'] if entry else None
+        file_watcher.start()
+        warm_cache.start()
+
     app.run(host='0.0.0.0', port=port, debug=True)
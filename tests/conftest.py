@@ -0,0 +1,31 @@
+import os
+import sys
+from unittest import mock
+
+import pytest
+
+# The backend modules live at the repo root next to server.py
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(scope='session')
+def server(tmp_path_factory):
+    """
+    The Flask app, imported from a scratch directory so its relative paths (settings,
+    backups, screenshots) stay out of the checkout. Background services aren't started.
+    """
+    pytest.importorskip('flask')
+    pytest.importorskip('flask_cors')
+    cwd = os.getcwd()
+    os.chdir(tmp_path_factory.mktemp('server'))
+    try:
+        with mock.patch.object(os, 'geteuid', return_value=0, create=True):
+            import server
+    finally:
+        os.chdir(cwd)
+    return server
+
+
+@pytest.fixture
+def client(server):
+    return server.app.test_client()
@@ -0,0 +1,77 @@
+import subprocess
+
+import pytest
+
+np = pytest.importorskip('numpy')
+
+import analysis
+from analysis import FrameAnalyzer
+
+WIDTH, HEIGHT = 16, 9
+
+
+def flat(*values):
+    """Uniform gray frames, one per value"""
+    return b''.join(np.full(WIDTH * HEIGHT, value, dtype=np.uint8).tobytes() for value in values)
+
+
+def textured(*offsets):
+    """A horizontal gradient (well above the covered threshold), shifted by each offset"""
+    base = np.tile(np.arange(0, 250, 250 // WIDTH, dtype=np.int16)[:WIDTH], HEIGHT)
+    return b''.join(np.clip(base + offset, 0, 255).astype(np.uint8).tobytes() for offset in offsets)
+
+
+@pytest.fixture
+def analyzer():
+    return FrameAnalyzer(lambda: 'ffmpeg', frames=5, width=WIDTH, height=HEIGHT)
+
+
+def test_short_capture_motion_ignores_padding(analyzer):
+    results = analyzer.classify({
+        'rtsp://long/1': textured(0, 0, 0, 0, 0),
+        'rtsp://short/1': textured(0, 4),
+    })
+
+    # One real pair with a change of 4 everywhere; padding would have diluted it to 1.0
+    assert results['rtsp://short/1']['motion'] == pytest.approx(4.0)
+    assert results['rtsp://short/1']['frames'] == 2
+    assert results['rtsp://long/1']['status'] == 'frozen'
+
+
+def test_static_live_scene_is_not_frozen(analyzer):
+    # A handful of pixels flickering by one level, like sensor noise on an empty corridor
+    noisy = np.frombuffer(textured(0, 0, 0), dtype=np.uint8).astype(np.int16).reshape(3, -1)
+    noisy[1, ::7] += 1
+    noisy[2, ::5] += 1
+    results = analyzer.classify({'rtsp://static/1': noisy.astype(np.uint8).tobytes()})
+    assert results['rtsp://static/1']['status'] == 'ok'
+
+
+def test_black_and_no_signal(analyzer):
+    results = analyzer.classify({'rtsp://black/1': flat(2, 2), 'rtsp://dead/1': None})
+
+    assert results['rtsp://black/1']['status'] == 'black'
+    assert results['rtsp://dead/1']['status'] == 'no_signal'
+
+
+def test_grab_falls_back_to_udp(analyzer, monkeypatch):
+    calls = []
+
+    def fake_run(cmd, **kwargs):
+        calls.append(cmd)
+        stdout = b'' if '-rtsp_transport' in cmd else flat(100, 100)
+        return subprocess.CompletedProcess(cmd, 0, stdout, b'')
+
+    monkeypatch.setattr(analysis.subprocess, 'run', fake_run)
+
+    assert analyzer.grab('rtsp://udp-only/1') == flat(100, 100)
+    assert ['-rtsp_transport' in cmd for cmd in calls] == [True, False]
+
+
+def test_submit_analyses_in_the_background(analyzer, monkeypatch):
+    monkeypatch.setattr(analyzer, 'grab', lambda url: textured(0, 4))
+
+    analyzer.submit(['rtsp://cam/1', 'rtsp://cam/1'])
+    analyzer._executor.shutdown(wait=True)
+
+    assert analyzer.latest()['rtsp://cam/1']['status'] == 'ok'
@@ -0,0 +1,56 @@
+import threading
+
+import capture
+from capture import ScreenshotCapturer
+
+
+class SlowCapturer(ScreenshotCapturer):
+    """Records each real capture and holds it until released"""
+
+    def __init__(self, tmp_path):
+        super().__init__(str(tmp_path), lambda: 'ffmpeg')
+        self.calls = []
+        self.started = threading.Semaphore(0)
+        self.release = threading.Event()
+
+    def _capture(self, url, low_priority=False):
+        self.calls.append(low_priority)
+        self.started.release()
+        self.release.wait(5)
+        return f'{"low" if low_priority else "normal"}.jpg'
+
+
+def run(target, *args, **kwargs):
+    result = {}
+    thread = threading.Thread(target=lambda: result.setdefault('value', target(*args, **kwargs)))
+    thread.start()
+    return thread, result
+
+
+def test_interactive_capture_does_not_join_background_capture(tmp_path):
+    capturer = SlowCapturer(tmp_path)
+
+    background, background_result = run(capturer.capture, 'rtsp://cam/1', low_priority=True)
+    assert capturer.started.acquire(timeout=5)
+    interactive, interactive_result = run(capturer.capture, 'rtsp://cam/1')
+    assert capturer.started.acquire(timeout=5)
+    # Another background refresh piggybacks on the normal-priority capture
+    joined, joined_result = run(capturer.capture, 'rtsp://cam/1', low_priority=True)
+    assert not capturer.started.acquire(timeout=0.2)
+
+    capturer.release.set()
+    for thread in (background, interactive, joined):
+        thread.join(5)
+
+    assert capturer.calls == [True, False]
+    assert background_result['value'] == 'low.jpg'
+    assert interactive_result['value'] == 'normal.jpg'
+    assert joined_result['value'] == 'normal.jpg'
+
+
+def test_low_priority_uses_a_command_prefix(monkeypatch):
+    monkeypatch.setattr(capture.shutil, 'which', lambda name: f'/usr/bin/{name}' if name == 'nice' else None)
+    assert capture.low_priority_prefix() == ['nice', '-n', '19']
+
+    monkeypatch.setattr(capture.shutil, 'which', lambda name: f'/usr/bin/{name}')
+    assert capture.low_priority_prefix() == ['chrt', '--idle', '0']
@@ -0,0 +1,145 @@
+import re
+import socket
+import hashlib
+import threading
+import socketserver
+
+import pytest
+
+from discovery import RTSPScanner, VENDOR_PATTERNS, max_concurrency
+
+DAHUA_PATH = '/cam/realmonitor?channel=1&subtype=0'
+REOLINK_PATH = '/h264Preview_01_main'
+REALM, NONCE = 'IP Camera', 'abc123'
+
+
+class FakeCameraHandler(socketserver.StreamRequestHandler):
+    """Answers RTSP DESCRIBE like a camera: 200 on its one real path, 401/404 elsewhere"""
+
+    def handle(self):
+        camera = self.server.camera
+        while True:
+            request = []
+            while True:
+                line = self.rfile.readline()
+                if not line:
+                    return
+                if line in (b'\r\n', b'\n'):
+                    break
+                request.append(line.decode())
+            uri = request[0].split()[1]
+            path = re.sub(r'^rtsp://[^/]+', '', uri)
+            headers = dict(line.strip().split(': ', 1) for line in request[1:])
+            cseq = headers.get('CSeq', '1')
+            camera.requests.append(path)
+
+            if camera.digest and not self._authorized(headers.get('Authorization', ''), uri):
+                self._reply(cseq, '401 Unauthorized', f'WWW-Authenticate: Digest realm="{REALM}", nonce="{NONCE}"\r\n')
+            elif path == camera.path:
+                body = 'v=0\r\n'
+                self._reply(cseq, '200 OK', f'Content-Type: application/sdp\r\nContent-Length: {len(body)}\r\n', body)
+            elif camera.digest:
+                self._reply(cseq, '404 Not Found')
+            else:
+                # Cheap firmware that asks for credentials on every path it doesn't serve
+                self._reply(cseq, '401 Unauthorized', f'WWW-Authenticate: Basic realm="{REALM}"\r\n')
+
+    def _authorized(self, header, uri):
+        camera = self.server.camera
+        params = dict(re.findall(r'(\w+)="?([^",]*)"?', header))
+        if not header.startswith('Digest') or params.get('username') != camera.username:
+            return False
+        ha1 = hashlib.md5(f'{camera.username}:{REALM}:{camera.password}'.encode()).hexdigest()
+        ha2 = hashlib.md5(f'DESCRIBE:{uri}'.encode()).hexdigest()
+        return params.get('response') == hashlib.md5(f'{ha1}:{NONCE}:{ha2}'.encode()).hexdigest()
+
+    def _reply(self, cseq, status, headers='', body=''):
+        self.wfile.write(f'RTSP/1.0 {status}\r\nCSeq: {cseq}\r\n{headers}\r\n{body}'.encode())
+
+
+class FakeCamera:
+    def __init__(self, path, digest=False, username='admin', password='secret'):
+        self.path = path
+        self.digest = digest
+        self.username = username
+        self.password = password
+        self.requests = []
+        self.server = socketserver.ThreadingTCPServer(('127.0.0.1', 0), FakeCameraHandler)
+        self.server.daemon_threads = True
+        self.server.camera = self
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    @property
+    def port(self):
+        return self.server.server_address[1]
+
+
+@pytest.fixture
+def cameras():
+    started = []
+
+    def start(*args, **kwargs):
+        camera = FakeCamera(*args, **kwargs)
+        started.append(camera)
+        return camera
+
+    yield start
+    for camera in started:
+        camera.server.shutdown()
+        camera.server.server_close()
+
+
+def scan(port, **kwargs):
+    events = []
+    RTSPScanner(ports=(port,), connect_timeout=0.5, rtsp_timeout=1.0, **kwargs).scan('127.0.0.1/32', events.append, onvif=False)
+    return events
+
+
+def closed_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def test_keeps_walking_past_401s_to_the_real_path(cameras):
+    camera = cameras(DAHUA_PATH)
+
+    events = scan(camera.port)
+
+    candidates = [event for event in events if event['type'] == 'candidate']
+    assert len(candidates) == 1
+    assert candidates[0]['vendor'] == 'Dahua / Amcrest'
+    assert candidates[0]['status'] == 200
+    assert candidates[0]['url'] == f'rtsp://127.0.0.1:{camera.port}{DAHUA_PATH}'
+
+
+def test_digest_credentials_find_the_path(cameras):
+    camera = cameras(REOLINK_PATH, digest=True)
+
+    events = scan(camera.port, username='admin', password='secret')
+
+    candidates = [event for event in events if event['type'] == 'candidate']
+    assert [(c['vendor'], c['status']) for c in candidates] == [('Reolink', 200)]
+
+
+def test_without_credentials_reports_auth_required_once(cameras):
+    camera = cameras(REOLINK_PATH, digest=True)
+
+    events = scan(camera.port)
+
+    assert not [event for event in events if event['type'] == 'candidate']
+    auth = [event for event in events if event['type'] == 'auth_required']
+    assert auth == [{'type': 'auth_required', 'ip': '127.0.0.1', 'port': camera.port, 'credentials_rejected': False}]
+    # The whole table was tried before giving up
+    assert len(camera.requests) == len(VENDOR_PATTERNS) + 1
+
+
+def test_concurrency_is_clamped():
+    assert RTSPScanner(concurrency=0).concurrency == 1
+    assert RTSPScanner(concurrency=10 ** 9).concurrency == max_concurrency()
+
+
+def test_closed_port_reports_nothing_but_done():
+    events = scan(closed_port(), concurrency=0)
+
+    assert [event['type'] for event in events] == ['done']
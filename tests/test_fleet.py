@@ -0,0 +1,129 @@
+import json
+import hashlib
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import pytest
+
+from fleet import FleetManager
+
+
+class FakeInstanceHandler(BaseHTTPRequestHandler):
+    """Just enough of the server.py API for fleet mode: health and monitor 1 with ETags"""
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status, payload, headers=None):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        instance = self.server.instance
+        if self.path == '/api/health':
+            return self._send(200, {'success': True, 'version': 'test'})
+        if self.path == '/api/monitors/1':
+            return self._send(200, {'success': True, 'content': instance.content, 'etag': instance.etag()})
+        self._send(404, {'success': False, 'error': 'Not found'})
+
+    def do_POST(self):
+        instance = self.server.instance
+        data = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        with instance.lock:
+            instance.posts += 1
+            if instance.fail_next > 0:
+                instance.fail_next -= 1
+                return self._send(503, {'success': False, 'error': 'Busy'})
+            if instance.edit_before_save:
+                # Someone edits the file locally between the fleet's GET and POST
+                instance.content += '\n# local edit'
+                instance.edit_before_save = False
+            expected = self.headers.get('If-Match')
+            if expected and expected.strip('"') != instance.etag():
+                return self._send(412, {'success': False, 'error': 'Configuration was modified elsewhere'})
+            instance.content = data['content']
+        self._send(200, {'success': True, 'etag': instance.etag()})
+
+
+class FakeInstance:
+    def __init__(self, content):
+        self.content = content
+        self.posts = 0
+        self.fail_next = 0
+        self.edit_before_save = False
+        self.lock = threading.Lock()
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), FakeInstanceHandler)
+        self.server.instance = self
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    @property
+    def url(self):
+        return f'http://127.0.0.1:{self.server.server_port}'
+
+    def etag(self):
+        return hashlib.sha1(self.content.encode()).hexdigest()
+
+
+@pytest.fixture
+def instances():
+    started = [FakeInstance('- url: "rtsp://old/1"') for _ in range(2)]
+    yield started
+    for instance in started:
+        instance.server.shutdown()
+
+
+@pytest.fixture
+def fleet(instances):
+    manager = FleetManager(
+        [{'name': f'host{i}', 'url': instance.url, 'group': 'wall'} for i, instance in enumerate(instances)],
+        retries=2
+    )
+    yield manager
+    manager.close()
+
+
+def test_push_config_reaches_every_host(fleet, instances):
+    results = fleet.push_config(fleet.select(group='wall'), 'essentials: {}')
+
+    assert all(result['success'] for result in results.values())
+    assert [instance.content for instance in instances] == ['essentials: {}', 'essentials: {}']
+
+
+def test_push_config_retries_server_errors(fleet, instances):
+    instances[0].fail_next = 1
+
+    results = fleet.push_config(fleet.select(), 'essentials: {}')
+
+    assert results['host0']['success']
+    assert results['host0']['attempts'] == 2
+    assert results['host1']['attempts'] == 1
+
+
+def test_camera_change_uses_if_match(fleet, instances):
+    instances[1].edit_before_save = True
+
+    results = fleet.push_camera_change(fleet.select(), 'rtsp://old/1', 'rtsp://new/1')
+
+    assert results['host0']['success'] and results['host0']['changed']
+    assert instances[0].content == '- url: "rtsp://new/1"'
+    # The local edit on host1 wins; the fleet change is rejected rather than overwriting it
+    assert not results['host1']['success']
+    assert results['host1']['status'] == 412
+    assert 'rtsp://old/1' in instances[1].content
+
+
+def test_unreachable_host_reports_error(instances):
+    manager = FleetManager([{'name': 'dead', 'url': 'http://127.0.0.1:1'}], retries=0)
+    try:
+        results = manager.health(manager.select())
+        assert not results['dead']['success']
+        assert results['dead']['error']
+    finally:
+        manager.close()
@@ -0,0 +1,118 @@
+import io
+import tempfile
+
+import yaml
+import pytest
+
+import importer
+
+STOCK_CONFIG = '''#THIS IS A YAML FILE, INDENTATION IS IMPORTANT. ALSO DO NOT USE TABS FOR INDENTATION, BUT USE SPACES
+
+essentials:
+  screens:
+    - streams:
+        - url: "rtsp://cam1/stream"
+#        - url: "rtsp://old-cam/stream"
+      duration: 30
+      nr_of_columns: 2
+
+    - streams:
+        - url: "rtsp://cam2/stream"
+
+######################################################################################
+#What follows is documentation
+#        - url: "rtsp://example/doc"
+'''
+
+
+def spooled(text):
+    """What Werkzeug hands us for a multipart upload"""
+    stream = tempfile.SpooledTemporaryFile()
+    stream.write(text.encode('utf-8-sig'))
+    stream.seek(0)
+    return stream
+
+
+def stream(url, screen=None, disabled=False, name=None):
+    return {'url': url, 'name': name, 'alternate_urls': [], 'screen': screen, 'disabled': disabled}
+
+
+def run_import(content, streams, **kwargs):
+    config = yaml.safe_load(content) if content.strip() else {}
+    assignments, screen_count = importer.plan_import(config, streams, **kwargs)
+    new_content = importer.apply_import(content, assignments)
+    return assignments, screen_count, new_content, yaml.safe_load(new_content)
+
+
+def test_iter_rows_csv():
+    rows = list(importer.iter_rows(spooled('URL,Name,Screen\nrtsp://a/1,"Front, door",2\nrtsp://b/1,,\n'), 'csv'))
+
+    assert rows == [
+        (2, {'url': 'rtsp://a/1', 'name': 'Front, door', 'screen': '2'}),
+        (3, {'url': 'rtsp://b/1', 'name': '', 'screen': ''}),
+    ]
+
+
+def test_iter_rows_ndjson():
+    rows = list(importer.iter_rows(io.BytesIO(b'{"url": "rtsp://a/1"}\n\nnot json\n[1]\n'), 'ndjson'))
+
+    assert rows[0] == (1, {'url': 'rtsp://a/1'})
+    assert rows[1][0] == 3 and rows[1][1]['_error'].startswith('Invalid JSON')
+    assert rows[2] == (4, {'_error': 'Row is not an object'})
+
+
+def test_existing_urls_include_commented_out_streams():
+    known = importer.existing_urls(STOCK_CONFIG)
+
+    assert 'rtsp://old-cam/stream' in known
+    assert 'rtsp://cam1/stream' in known
+
+
+def test_inserts_before_screen_properties():
+    _, _, new_content, new_config = run_import(STOCK_CONFIG, [stream('rtsp://new/1', screen=1)])
+
+    first = new_config['essentials']['screens'][0]
+    assert [s['url'] for s in first['streams']] == ['rtsp://cam1/stream', 'rtsp://new/1']
+    assert first['duration'] == 30 and first['nr_of_columns'] == 2
+    assert new_content.index('rtsp://new/1') < new_content.index('duration: 30')
+
+
+def test_stops_at_documentation_footer():
+    _, _, new_content, new_config = run_import(STOCK_CONFIG, [stream('rtsp://new/2', screen=2)])
+
+    assert [s['url'] for s in new_config['essentials']['screens'][1]['streams']] == ['rtsp://cam2/stream', 'rtsp://new/2']
+    assert new_content.index('rtsp://new/2') < new_content.index('#####')
+
+
+def test_spills_onto_new_screens():
+    streams = [stream(f'rtsp://new/{i}') for i in range(6)]
+
+    assignments, screen_count, _, new_config = run_import(STOCK_CONFIG, streams, columns=2)
+
+    assert screen_count == 3
+    assert importer.stream_counts(new_config) == [1, 4, 3]
+    assert new_config['essentials']['screens'][2]['nr_of_columns'] == 2
+    assert {index: len(items) for index, items in assignments.items()} == {1: 3, 2: 3}
+
+
+def test_new_screens_follow_requested_numbers():
+    streams = [stream('rtsp://second/1', screen=2), stream('rtsp://first/1', screen=1)]
+
+    assignments, screen_count, _, new_config = run_import('', streams)
+
+    assert screen_count == 2
+    assert [s['streams'][0]['url'] for s in new_config['essentials']['screens']] == ['rtsp://first/1', 'rtsp://second/1']
+
+
+def test_screen_numbers_with_gaps_are_rejected():
+    with pytest.raises(ValueError):
+        importer.plan_import({}, [stream('rtsp://new/5', screen=5), stream('rtsp://new/2', screen=2)])
+
+
+def test_empty_config_bootstrap():
+    _, screen_count, new_content, new_config = run_import('', [stream('rtsp://new/1', name='Gate'), stream('rtsp://new/2', disabled=True)])
+
+    assert screen_count == 1
+    assert [s['url'] for s in new_config['essentials']['screens'][0]['streams']] == ['rtsp://new/1']
+    assert '#Gate' in new_content
+    assert '#        - url: "rtsp://new/2"' in new_content
@@ -0,0 +1,96 @@
+import pytest
+
+from layout import LayoutEngine, grid_rects, find_overlaps, find_gaps, best_grid
+
+
+def tiles(*rects):
+    return [{'index': i, 'rect': list(rect)} for i, rect in enumerate(rects)]
+
+
+def test_grid_rects_round_halves_up_like_the_browser():
+    # 5 / 2 = 2.5: Math.round gives 3, Python's round() would give 2
+    assert grid_rects(2, 2, 5, 10) == [[0, 0, 3, 10], [3, 0, 5, 10]]
+    assert grid_rects(3, 3, 1000, 100) == [[0, 0, 333, 100], [333, 0, 667, 100], [667, 0, 1000, 100]]
+    assert grid_rects(0, 2, 1920, 1080) == []
+
+
+def test_find_overlaps_reports_intersections_only():
+    found = find_overlaps(tiles(
+        (0, 0, 100, 100),
+        (50, 50, 150, 150),
+        (100, 0, 200, 40),   # only touches the first tile's edge
+        (300, 0, 400, 100),
+    ))
+
+    assert [(o['a'], o['b'], o['rect'], o['area']) for o in found] == [
+        (0, 1, [50, 50, 100, 100], 2500),
+    ]
+
+
+def test_find_overlaps_across_columns():
+    found = find_overlaps(tiles((0, 0, 100, 100), (90, 90, 200, 200), (150, 150, 300, 300)))
+
+    assert [(o['a'], o['b']) for o in found] == [(0, 1), (1, 2)]
+
+
+def test_find_gaps_merges_slabs_into_one_gap():
+    # Missing bottom-right cell, but the top-right is split into two tiles, so the
+    # empty cell spans two x slabs
+    gaps, covered = find_gaps(tiles(
+        (0, 0, 50, 50), (50, 0, 80, 50), (80, 0, 100, 50),
+        (0, 50, 50, 100),
+    ), 100, 100)
+
+    assert gaps == [[50, 50, 100, 100]]
+    assert covered == 7500
+
+
+def test_find_gaps_clips_out_of_bounds_tiles():
+    gaps, covered = find_gaps(tiles((-50, -50, 50, 50), (50, 0, 150, 100)), 100, 100)
+
+    assert gaps == [[0, 50, 50, 100]]
+    assert covered == 7500
+
+
+def test_find_gaps_empty_screen():
+    assert find_gaps([], 100, 50) == ([[0, 0, 100, 50]], 0)
+
+
+@pytest.mark.parametrize('count, expected', [(0, (1, 0)), (1, (1, 1)), (3, (2, 2)), (4, (2, 2)), (9, (3, 3))])
+def test_best_grid(count, expected):
+    assert best_grid(count, 1920, 1080) == expected
+
+
+def test_screen_layout_forced_and_grid_tiles():
+    layout = LayoutEngine().screen_layout({
+        'nr_of_columns': 2,
+        'streams': [
+            {'url': 'rtsp://a'},
+            {'url': 'rtsp://b'},
+            {'url': 'rtsp://pip', 'force_coordinates': [1500, 800, 2000, 1100], 'showontop': True},
+        ]
+    }, 1920, 1080)
+
+    assert [tile['rect'] for tile in layout['tiles']] == [[0, 0, 960, 1080], [960, 0, 1920, 1080], [1500, 800, 2000, 1100]]
+    assert layout['overlaps'] == []
+    assert layout['tiles'][2]['out_of_bounds']
+    assert layout['coverage'] == 1.0
+
+
+@pytest.mark.parametrize('config', ['just a string', {'essentials': {'screens': 'nope'}}, {'essentials': {'screens': [{'streams': [
+    {'url': 'rtsp://a', 'force_coordinates': ['left', 0, 10, 10]}
+]}]}}])
+def test_compute_rejects_malformed_config(config):
+    with pytest.raises(ValueError):
+        LayoutEngine().compute(config, 1920, 1080)
+
+
+@pytest.mark.parametrize('content', [
+    'just a string',
+    'essentials:\n  screens:\n    - streams:\n        - url: "rtsp://a"\n          force_coordinates: [a, 0, 10, 10]\n',
+])
+def test_layout_route_answers_400_for_bad_input(client, content):
+    response = client.post('/api/layout', json={'content': content})
+
+    assert response.status_code == 400
+    assert not response.get_json()['success']
@@ -0,0 +1,106 @@
+import sys
+import time
+
+import pytest
+
+from live import LivePreviewHub
+
+# Stands in for ffmpeg: writes a tiny "JPEG" every 20ms, or nothing at all for a stalled camera
+FAKE_FFMPEG = f'''#!{sys.executable}
+import sys, time
+url = sys.argv[sys.argv.index('-i') + 1]
+n = 0
+while True:
+    if 'stall' not in url:
+        n += 1
+        sys.stdout.buffer.write(b'\\xff\\xd8' + str(n).encode() + b'\\xff\\xd9')
+        sys.stdout.buffer.flush()
+    time.sleep(0.02)
+'''
+
+
+@pytest.fixture
+def hub(tmp_path):
+    script = tmp_path / 'ffmpeg'
+    script.write_text(FAKE_FFMPEG)
+    script.chmod(0o755)
+    hub = LivePreviewHub(lambda: str(script), idle_timeout=0.2, frame_timeout=0.1, max_missed_frames=3)
+    yield hub
+    hub.stop_all()
+
+
+def wait_until(condition, timeout=5):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if condition():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+def test_viewers_share_one_decoder_until_idle(hub):
+    first = hub.acquire('rtsp://cam/1')
+    second = hub.acquire('rtsp://cam/1')
+    assert first is second
+    assert first.viewers == 2
+
+    chunk = next(hub.stream(first))
+    assert chunk.startswith(b'--frame\r\nContent-Type: image/jpeg')
+
+    hub.release(first)
+    hub.release(second)
+    assert first.running
+    process = first._process
+    assert wait_until(lambda: not hub.status())
+    assert not first.running
+    assert process.wait(timeout=5) is not None
+
+
+def test_reacquire_within_idle_timeout_keeps_decoder(hub):
+    decoder = hub.acquire('rtsp://cam/1')
+    hub.release(decoder)
+
+    again = hub.acquire('rtsp://cam/1')
+    time.sleep(0.4)
+
+    assert again is decoder
+    assert decoder.running
+    assert hub.status()[0]['viewers'] == 1
+    hub.release(again)
+
+
+def test_stalled_camera_ends_the_stream(hub):
+    decoder = hub.acquire('rtsp://stall/1')
+
+    start = time.time()
+    assert list(hub.stream(decoder)) == []
+    assert time.time() - start < 2
+    assert not decoder.running
+    assert decoder.error.startswith('No frame')
+
+    hub.release(decoder)
+    assert wait_until(lambda: not hub.status())
+
+
+def test_stalled_decoder_is_replaced_on_next_acquire(hub):
+    decoder = hub.acquire('rtsp://stall/1')
+    list(hub.stream(decoder))
+
+    replacement = hub.acquire('rtsp://stall/1')
+
+    assert replacement is not decoder
+    assert replacement.running
+    hub.release(decoder)
+    time.sleep(0.4)
+    assert replacement.running
+    hub.release(replacement)
+
+
+@pytest.mark.parametrize('url, option', [('rtsp://cam/1', '-timeout'), ('http://cam/video.mjpg', '-rw_timeout')])
+def test_ffmpeg_gets_an_io_timeout(hub, url, option):
+    decoder = hub.acquire(url)
+    try:
+        args = decoder._process.args
+        assert args[args.index(option) + 1] == '100000'
+    finally:
+        hub.release(decoder)
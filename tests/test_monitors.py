@@ -0,0 +1,96 @@
+import os
+import threading
+
+import pytest
+
+from monitors import MonitorStore, ConflictError
+
+CONFIG = 'essentials:\n  screens:\n    - streams:\n        - url: "rtsp://cam/1"\n'
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = MonitorStore(str(tmp_path / 'config'), str(tmp_path / 'backups'))
+    store.save(1, CONFIG)
+    return store
+
+
+def test_load_reuses_cache_until_mtime_or_size_changes(store, monkeypatch):
+    first = store.load(1)
+    reads = []
+    real_open = open
+    monkeypatch.setattr('builtins.open', lambda *args, **kwargs: reads.append(args[0]) or real_open(*args, **kwargs))
+
+    assert store.load(1) is first
+    assert reads == []
+
+    # Same size, newer mtime: re-read
+    stat = os.stat(store.path(1))
+    os.utime(store.path(1), ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000000))
+    assert store.load(1) is not first
+    assert reads == [store.path(1)]
+
+
+def test_save_rejects_stale_etag(store):
+    loaded = store.load(1)
+    store.save(1, CONFIG + '      duration: 10\n', expected_etag=f'"{loaded["etag"]}"')
+
+    with pytest.raises(ConflictError) as error:
+        store.save(1, CONFIG, expected_etag=loaded['etag'])
+
+    assert error.value.etag == store.load(1)['etag']
+    assert 'duration: 10' in store.load(1)['content']
+
+
+def test_concurrent_saves_with_same_etag_only_one_wins(store):
+    etag = store.load(1)['etag']
+    outcomes = []
+
+    def save(n):
+        try:
+            store.save(1, CONFIG + f'# writer {n}\n', expected_etag=etag)
+            outcomes.append('saved')
+        except ConflictError:
+            outcomes.append('conflict')
+
+    threads = [threading.Thread(target=save, args=(n,)) for n in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(outcomes) == ['conflict'] * 7 + ['saved']
+
+
+def test_backups_are_per_monitor(store):
+    store.save(10, CONFIG)
+    store.save(10, CONFIG + '# edit\n')
+    store.save(1, CONFIG + '# edit\n')
+
+    assert [b['filename'].startswith('monitor1_') for b in store.backups(1)] == [True]
+    assert all(b['filename'].startswith('monitor10_') for b in store.backups(10))
+    assert len(store.backups()) == 2
+
+
+@pytest.fixture
+def routes(server, store, monkeypatch):
+    monkeypatch.setattr(server, 'monitor_store', store)
+    return server.app.test_client()
+
+
+def test_get_monitor_answers_304_for_matching_etag(routes, store):
+    etag = f'"{store.load(1)["etag"]}"'
+
+    response = routes.get('/api/monitors/1', headers={'If-None-Match': etag})
+
+    assert response.status_code == 304
+    assert response.headers['ETag'] == etag
+    assert routes.get('/api/monitors/1', headers={'If-None-Match': '"stale"'}).status_code == 200
+
+
+def test_save_monitor_answers_412_for_stale_if_match(routes, store):
+    response = routes.post('/api/monitors/1', json={'content': CONFIG + '# edit\n'}, headers={'If-Match': '"stale"'})
+
+    assert response.status_code == 412
+    assert response.get_json()['etag'] == store.load(1)['etag']
+    assert store.load(1)['content'] == CONFIG
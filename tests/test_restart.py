@@ -0,0 +1,108 @@
+import threading
+import subprocess
+
+import pytest
+
+import restart
+from restart import RestartManager
+
+
+class FakeSystemctl:
+    """Stands in for subprocess.run: each `systemctl restart` blocks until released"""
+
+    def __init__(self):
+        self.restarts = 0
+        self.running = 0
+        self.max_running = 0
+        self.started = threading.Semaphore(0)
+        self.release = threading.Event()
+        self.lock = threading.Lock()
+
+    def __call__(self, cmd, **kwargs):
+        if 'restart' in cmd:
+            with self.lock:
+                self.restarts += 1
+                self.running += 1
+                self.max_running = max(self.max_running, self.running)
+            self.started.release()
+            self.release.wait(5)
+            with self.lock:
+                self.running -= 1
+            return subprocess.CompletedProcess(cmd, 0, '', '')
+        return subprocess.CompletedProcess(cmd, 0, 'active\n', '')
+
+
+@pytest.fixture
+def systemctl(monkeypatch):
+    fake = FakeSystemctl()
+    monkeypatch.setattr(restart.subprocess, 'run', fake)
+    return fake
+
+
+@pytest.fixture
+def manager(tmp_path):
+    manager = RestartManager(lambda: manager.config, str(tmp_path / 'applied.json'), debounce=0.05)
+    manager.config = {'essentials': {'rtsp_timeout': 1}}
+    return manager
+
+
+def request(manager, results, force=False):
+    thread = threading.Thread(target=lambda: results.append(manager.request(force=force)))
+    thread.start()
+    return thread
+
+
+def test_same_config_during_restart_is_skipped(manager, systemctl):
+    results = []
+
+    first = request(manager, results)
+    assert systemctl.started.acquire(timeout=5)
+    # Not applied yet, so this schedules a restart; it must wait and then find nothing to do
+    second = request(manager, results)
+    assert not systemctl.started.acquire(timeout=0.3)
+    systemctl.release.set()
+    first.join(5)
+    second.join(5)
+
+    assert systemctl.restarts == 1
+    assert systemctl.max_running == 1
+    assert sorted(result['restarted'] for result in results) == [False, True]
+
+
+def test_changed_config_during_restart_restarts_again(manager, systemctl):
+    results = []
+
+    first = request(manager, results)
+    assert systemctl.started.acquire(timeout=5)
+    manager.config = {'essentials': {'rtsp_timeout': 2}}
+    second = request(manager, results)
+    systemctl.release.set()
+    first.join(5)
+    second.join(5)
+
+    assert systemctl.restarts == 2
+    assert systemctl.max_running == 1
+    assert manager.load_state()['config'] == {'essentials': {'rtsp_timeout': 2}}
+
+
+def test_requests_within_debounce_share_one_restart(manager, systemctl):
+    systemctl.release.set()
+    results = []
+
+    threads = [request(manager, results) for _ in range(3)]
+    for thread in threads:
+        thread.join(5)
+
+    assert systemctl.restarts == 1
+    assert [result['coalesced'] for result in results] == [2, 2, 2]
+
+
+def test_unchanged_config_skips_unless_forced(manager, systemctl):
+    systemctl.release.set()
+    results = []
+    request(manager, results).join(5)
+    request(manager, results).join(5)
+    request(manager, results, force=True).join(5)
+
+    assert [result['restarted'] for result in results] == [True, False, True]
+    assert systemctl.restarts == 2
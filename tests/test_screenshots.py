@@ -0,0 +1,31 @@
+import pytest
+
+
+@pytest.fixture
+def captures(server, monkeypatch):
+    calls = []
+
+    def capture(url, max_age=0, low_priority=False):
+        calls.append(max_age)
+        return 'cam.jpg'
+
+    monkeypatch.setattr(server.capturer, 'capture', capture)
+    monkeypatch.setattr(server.capturer, 'cached', lambda url, max_age=None: None)
+    monkeypatch.setattr(server, 'load_settings', lambda: {'screenshot_max_age': 10, 'frame_analysis': False})
+    return calls
+
+
+@pytest.mark.parametrize('body, expected', [({}, 10), ({'max_age': None}, 10), ({'max_age': '30'}, 30), ({'max_age': -5}, 0)])
+def test_max_age_falls_back_to_setting(client, captures, body, expected):
+    response = client.post('/api/screenshots/capture', json={'streams': [{'url': 'rtsp://cam/1'}], **body})
+
+    assert response.status_code == 200
+    assert captures == [expected]
+
+
+@pytest.mark.parametrize('max_age', ['soon', [1]])
+def test_invalid_max_age_is_a_400(client, captures, max_age):
+    response = client.post('/api/screenshots/capture', json={'streams': [{'url': 'rtsp://cam/1'}], 'max_age': max_age})
+
+    assert response.status_code == 400
+    assert captures == []
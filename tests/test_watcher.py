@@ -0,0 +1,108 @@
+import os
+import json
+from queue import Queue, Empty
+
+import pytest
+
+import watcher
+from watcher import FileWatcher, EventBroadcaster
+from monitors import MONITOR_PATTERN
+
+
+def monitor_files(path):
+    return MONITOR_PATTERN.match(os.path.basename(path))
+
+
+@pytest.fixture(params=['inotify', 'polling'])
+def watched(request, tmp_path, monkeypatch):
+    if request.param == 'polling':
+        monkeypatch.setattr(watcher, '_load_inotify', lambda: None)
+    changes = Queue()
+    file_watcher = FileWatcher([str(tmp_path)], monitor_files, changes.put, poll_interval=0.05)
+    file_watcher.start()
+    if file_watcher.mode != request.param:
+        pytest.skip(f'{request.param} not available here')
+    return tmp_path, changes
+
+
+def drain(changes, timeout=1.0):
+    seen = []
+    try:
+        while True:
+            seen.append(changes.get(timeout=timeout))
+            timeout = 0.3
+    except Empty:
+        return seen
+
+
+def test_rename_over_is_detected_and_temp_files_ignored(watched):
+    directory, changes = watched
+    target = directory / 'monitor1.yml'
+    target.write_text('essentials: {}\n')
+    drain(changes)
+
+    temp = directory / 'monitor1.yml.tmp'
+    temp.write_text('essentials:\n  screens: []\n')
+    os.replace(temp, target)
+
+    seen = drain(changes)
+    assert str(target) in seen
+    assert all(monitor_files(path) for path in seen)
+
+
+def test_unrelated_files_are_ignored(watched):
+    directory, changes = watched
+    (directory / 'notes.txt').write_text('hello')
+    (directory / 'monitor1.yml.swp').write_text('swap')
+
+    assert drain(changes, timeout=0.5) == []
+
+
+def test_subscriber_is_removed_when_stream_closes():
+    events = EventBroadcaster(keepalive=0.05)
+    stream = events.stream()
+
+    assert next(stream) == 'retry: 3000\n\n'
+    assert events.client_count == 1
+    events.publish({'type': 'config', 'monitor': 1})
+    message = next(stream)
+    assert message.startswith('event: config\n')
+    assert json.loads(message.split('data: ', 1)[1]) == {'type': 'config', 'monitor': 1}
+
+    stream.close()
+    assert events.client_count == 0
+
+
+def test_stalled_subscriber_drops_events_instead_of_blocking():
+    events = EventBroadcaster(queue_size=2)
+    stream = events.stream()
+    next(stream)
+
+    for n in range(5):
+        events.publish({'type': 'config', 'monitor': n})
+
+    assert [json.loads(next(stream).split('data: ', 1)[1])['monitor'] for _ in range(2)] == [0, 1]
+    stream.close()
+
+
+def test_event_route_unsubscribes_on_close(server, client):
+    response = client.get('/api/events', buffered=False)
+    chunks = iter(response.response)
+    next(chunks)
+    assert server.events.client_count == 1
+
+    response.close()
+    assert server.events.client_count == 0
+
+
+def test_broken_settings_file_keeps_last_good_settings(server, tmp_path, monkeypatch):
+    settings_file = tmp_path / 'gui_settings.json'
+    monkeypatch.setattr(server, 'SETTINGS_FILE', str(settings_file))
+    monkeypatch.setattr(server, '_settings_cache', None)
+
+    server.save_settings({**server.DEFAULT_SETTINGS, 'port': 1234})
+    assert not os.path.exists(f'{settings_file}.tmp')
+    settings_file.write_text('{"port": 12')
+    server.on_file_changed(str(settings_file))
+
+    assert server.load_settings()['port'] == 1234
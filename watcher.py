@@ -0,0 +1,160 @@
+import os
+import json
+import time
+import struct
+from queue import Queue, Full, Empty
+from threading import Thread, Lock
+
+
+# inotify flags (see <sys/inotify.h>)
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+EVENT_HEADER = struct.Struct('iIII')
+
+
+def _load_inotify():
+    """Return libc if inotify is usable, else None (Windows, macOS, restricted containers)"""
+    if not hasattr(os, 'uname') or os.uname().sysname != 'Linux':
+        return None
+    try:
+        import ctypes
+        import ctypes.util
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        libc.inotify_init.restype = int
+        libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        return libc
+    except Exception:
+        return None
+
+
+class FileWatcher:
+    """
+    Calls `callback(path)` whenever one of the watched files changes.
+    Uses inotify on the parent directories on Linux, so editors that save by
+    renaming a temp file over the original are caught too; elsewhere it falls back
+    to polling mtime/size once a second. `matcher(path)` decides which files count.
+    """
+
+    def __init__(self, directories, matcher, callback, poll_interval=1.0):
+        self.directories = [os.path.abspath(d) for d in directories]
+        self.matcher = matcher
+        self.callback = callback
+        self.poll_interval = poll_interval
+        self.mode = None
+        self._thread = None
+
+    def start(self):
+        libc = _load_inotify()
+        fd = libc.inotify_init() if libc else -1
+        if fd >= 0:
+            watched = {}
+            for directory in self.directories:
+                if os.path.isdir(directory):
+                    wd = libc.inotify_add_watch(fd, directory.encode(), WATCH_MASK)
+                    if wd >= 0:
+                        watched[wd] = directory
+            if watched:
+                self.mode = 'inotify'
+                self._thread = Thread(target=self._run_inotify, args=(fd, watched), daemon=True)
+                self._thread.start()
+                return
+            os.close(fd)
+        self.mode = 'polling'
+        self._thread = Thread(target=self._run_polling, daemon=True)
+        self._thread.start()
+
+    def _run_inotify(self, fd, descriptors):
+        while True:
+            try:
+                data = os.read(fd, 64 * 1024)
+            except OSError:
+                return
+            changed = []
+            offset = 0
+            while offset < len(data):
+                wd, mask, cookie, length = EVENT_HEADER.unpack_from(data, offset)
+                offset += EVENT_HEADER.size
+                name = data[offset:offset + length].rstrip(b'\0').decode('utf-8', errors='replace')
+                offset += length
+                path = os.path.join(descriptors.get(wd, ''), name)
+                if name and self.matcher(path) and path not in changed:
+                    changed.append(path)
+            for path in changed:
+                self._notify(path)
+
+    def _snapshot(self):
+        state = {}
+        for directory in self.directories:
+            if not os.path.isdir(directory):
+                continue
+            for name in os.listdir(directory):
+                path = os.path.join(directory, name)
+                if self.matcher(path):
+                    try:
+                        stat = os.stat(path)
+                        state[path] = (stat.st_mtime_ns, stat.st_size)
+                    except OSError:
+                        pass
+        return state
+
+    def _run_polling(self):
+        previous = self._snapshot()
+        while True:
+            time.sleep(self.poll_interval)
+            current = self._snapshot()
+            for path in set(previous) | set(current):
+                if previous.get(path) != current.get(path):
+                    self._notify(path)
+            previous = current
+
+    def _notify(self, path):
+        try:
+            self.callback(path)
+        except Exception as e:
+            print(f"File watcher callback failed for {path}: {e}")
+
+
+class EventBroadcaster:
+    """Fan-out of server events to every connected Server-Sent Events client"""
+
+    def __init__(self, keepalive=15, queue_size=100):
+        self.keepalive = keepalive
+        self.queue_size = queue_size
+        self._subscribers = []
+        self._lock = Lock()
+
+    def publish(self, event):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for queue in subscribers:
+            try:
+                queue.put_nowait(event)
+            except Full:
+                pass  # A stalled client misses events; it resyncs on reconnect
+
+    def stream(self):
+        """Generator of SSE-formatted messages for one client"""
+        queue = Queue(maxsize=self.queue_size)
+        with self._lock:
+            self._subscribers.append(queue)
+        try:
+            yield 'retry: 3000\n\n'
+            while True:
+                try:
+                    event = queue.get(timeout=self.keepalive)
+                except Empty:
+                    yield ': keepalive\n\n'
+                    continue
+                yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+        finally:
+            with self._lock:
+                self._subscribers.remove(queue)
+
+    @property
+    def client_count(self):
+        with self._lock:
+            return len(self._subscribers)
@@ -12,7 +12,8 @@ const state = {
     currentFilePath: '/etc/opensurv/monitor1.yml', // Default for display
     editMode: 'add', // 'add' or 'edit'
     screenshots: {}, // url -> filename mapping
-    hasUnsavedChanges: false
+    hasUnsavedChanges: false,
+    configEtag: null // ETag of the monitor1.yml content currently loaded
 };
 
 // ===== YAML Parser (Simple Implementation) =====
@@ -1198,6 +1199,7 @@ async function loadConfig() {
 
         if (data.success) {
             state.config = YAMLParser.parse(data.content);
+            state.configEtag = data.etag || null;
 
             // Update UI
             // Update UI
@@ -1219,7 +1221,28 @@ async function loadConfig() {
     }
 }
 
-async function saveConfig() {
+// ===== Live Change Notifications =====
+let configSaveInFlight = false; // Our own save also fires a change event; ignore it
+
+function subscribeToConfigEvents() {
+    if (!window.EventSource) return;
+
+    const source = new EventSource(`${API_BASE}/api/events`);
+    source.addEventListener('config', (event) => {
+        const data = JSON.parse(event.data);
+        if (configSaveInFlight || data.monitor !== 1 || data.etag === state.configEtag) return;
+
+        if (data.deleted) {
+            showToast('Config Removed', 'monitor1.yml was deleted on disk', 'warning');
+        } else if (state.hasUnsavedChanges) {
+            showToast('Config Changed', 'monitor1.yml was changed on disk. You will be asked before saving over it.', 'warning');
+        } else {
+            loadConfig();
+        }
+    });
+}
+
+async function saveConfig(etag = state.configEtag) {
     try {
         // Update global settings
         state.config.essentials.disable_autorotation = document.getElementById('disableAutorotation').checked;
@@ -1230,17 +1253,33 @@ async function saveConfig() {
         const yamlText = YAMLParser.stringify(state.config);
 
         // Save to backend
-        const response = await fetch(`${API_BASE}/api/config`, {
-            method: 'POST',
-            headers: {
-                'Content-Type': 'application/json'
-            },
-            body: JSON.stringify({ content: yamlText })
-        });
+        configSaveInFlight = true;
+        let response, data;
+        try {
+            // Send the ETag we loaded so the server refuses to overwrite changes made on disk since
+            const headers = { 'Content-Type': 'application/json' };
+            if (etag) headers['If-Match'] = `"${etag}"`;
+            response = await fetch(`${API_BASE}/api/config`, {
+                method: 'POST',
+                headers: headers,
+                body: JSON.stringify({ content: yamlText })
+            });
+            data = await response.json();
+        } finally {
+            configSaveInFlight = false;
+        }
 
-        const data = await response.json();
+        if (response.status === 412) {
+            if (confirm('monitor1.yml was changed on disk since you loaded it.\n\nOK: overwrite it with your changes\nCancel: discard your changes and reload it')) {
+                return saveConfig(data.etag);
+            }
+            clearChangedFlag();
+            await loadConfig();
+            return;
+        }
 
         if (data.success) {
+            state.configEtag = data.etag || null;
             clearChangedFlag();
             showToast('Config Saved', 'Configuration saved successfully (backup created)', 'success');
         } else {
@@ -1294,18 +1333,28 @@ async function restartOpenSurv() {
         // Save current config first
         await saveConfig();
 
-        // Send restart command
-        const response = await fetch(`${API_BASE}/api/restart`, {
-            method: 'POST',
-            headers: {
-                'Content-Type': 'application/json'
-            }
-        });
+        // Send restart command (the server skips it if nothing OpenSurv reads has changed)
+        const sendRestart = async (force) => {
+            const response = await fetch(`${API_BASE}/api/restart`, {
+                method: 'POST',
+                headers: {
+                    'Content-Type': 'application/json'
+                },
+                body: JSON.stringify({ force })
+            });
+            return response.json();
+        };
 
-        const data = await response.json();
+        let data = await sendRestart(false);
+        if (data.success && !data.restarted && confirm('The configuration has not changed since the last restart. Restart anyway?')) {
+            data = await sendRestart(true);
+        }
 
-        if (data.success) {
-            showToast('OpenSurv Restarted', 'OpenSurv is restarting...', 'success');
+        if (data.success && !data.restarted) {
+            showToast('Restart Skipped', data.message || 'Configuration unchanged', 'info');
+        } else if (data.success) {
+            const timing = data.time_to_healthy ? ` Display back in ${data.time_to_healthy}s.` : '';
+            showToast('OpenSurv Restarted', `OpenSurv restarted successfully.${timing}`, 'success');
         } else {
             throw new Error(data.error || 'Failed to restart OpenSurv');
         }
@@ -1540,11 +1589,12 @@ function closePreviewModal() {
 document.addEventListener('DOMContentLoaded', () => {
     // Load initial config
     loadConfig();
+    subscribeToConfigEvents();
 
     // Header buttons
     document.getElementById('importBtn').addEventListener('click', importConfig);
     document.getElementById('exportBtn').addEventListener('click', exportConfig);
-    document.getElementById('saveBtn').addEventListener('click', saveConfig);
+    document.getElementById('saveBtn').addEventListener('click', () => saveConfig());
     document.getElementById('headerUpdatesBtn').addEventListener('click', () => {
         openSettingsModal();
         // Scroll to bottom to show updates section